@@ -17,26 +17,67 @@ import asyncio
 import json
 import os
 import re
+import time
 import logging
-from datetime import datetime
+import logging.handlers
+import queue
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from typing import Awaitable
 
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv(".env.local")
 
+# One OpenMP/ONNX Runtime thread per process — the Silero model is tiny and
+# several job processes share the host, so extra threads only contend.
+# Must be set before the silero plugin loads onnxruntime below.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+try:
+    import uvloop
+except ImportError:  # optional — falls back to the default asyncio loop
+    uvloop = None
+
+
+def _use_uvloop(module_name: str) -> bool:
+    """Make uvloop the event loop policy when running as the worker.
+
+    Applies in the worker process ("__main__") and in its job processes,
+    which LiveKit starts through multiprocessing and which import this module
+    as "__mp_main__"; not when the module is merely imported, e.g. by tests.
+    The policy is set explicitly (uvloop.install() is deprecated on 3.12+)
+    and is what the loops LiveKit's runner creates are built from.
+    Returns True if the policy was set.
+    """
+    if uvloop is None or module_name not in ("__main__", "__mp_main__"):
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+_use_uvloop(__name__)
+
+import numpy as np
 from livekit import api, agents
 from livekit.agents import (
     Agent,
+    APIConnectionError,
     AgentSession,
     JobContext,
+    JobProcess,
     function_tool,
     get_job_context,
     RunContext,
     llm,
+    utils,
 )
 from livekit.agents.voice.room_io import RoomOptions
 from livekit.plugins import anthropic, openai, silero, sarvam
+from livekit.plugins.silero.onnx_model import OnnxModel as _SileroOnnxModel
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 logger = logging.getLogger("price-caller.agent")
@@ -48,25 +89,63 @@ logger = logging.getLogger("price-caller.agent")
 # See: livekit-plugins-sarvam SpeechStream._run  (line 842 in stt.py)
 # ---------------------------------------------------------------------------
 from livekit.plugins.sarvam.stt import SpeechStream as _SarvamSpeechStream
-_orig_stt_run = _SarvamSpeechStream._run
+
+_STT_RECONNECT_ATTEMPTS = 5
+_STT_RECONNECT_BASE_DELAY = 0.25  # seconds, doubled per consecutive failure
+_STT_RECONNECT_MAX_DELAY = 4.0
+_STT_RECONNECT_DEADLINE = 10.0  # seconds from the first failure of an outage
+
 
 async def _patched_stt_run(self):
-    """Keep reconnecting the STT WebSocket until the session ends."""
-    import aiohttp
+    """Keep reconnecting the STT WebSocket until the session ends.
+
+    A connection error reconnects with capped exponential backoff instead of
+    handing over to the original _run once and exiting. Audio pushed in the
+    meantime stays queued in _input_ch and is sent on the new connection.
+
+    This loop replaces the framework's STT retry instead of running inside
+    it. An outage is given up on after _STT_RECONNECT_ATTEMPTS reconnects, or
+    once the next one would start more than _STT_RECONNECT_DEADLINE seconds
+    after its first failure, whichever comes first: the error is re-raised as
+    a non-retryable APIConnectionError, so RecognizeStream does not start
+    another round on top. That bounds an outage at 6 connection attempts,
+    the last of them starting within 10s of the first failure. A connection
+    that stayed up for longer than the deadline before failing starts a new
+    outage.
+    """
+    failures = 0
+    outage_start = 0.0
     while True:
+        started = time.monotonic()
         try:
             await self._run_connection()
+            failures = 0
+        except Exception as e:
+            if self._input_ch.closed:
+                raise
+            now = time.monotonic()
+            if failures == 0 or now - started > _STT_RECONNECT_DEADLINE:
+                failures, outage_start = 0, now
+            failures += 1
+            delay = min(_STT_RECONNECT_BASE_DELAY * 2 ** (failures - 1), _STT_RECONNECT_MAX_DELAY)
+            if failures > _STT_RECONNECT_ATTEMPTS or now + delay - outage_start > _STT_RECONNECT_DEADLINE:
+                raise APIConnectionError(
+                    f"Sarvam STT reconnect gave up after {failures} failures", retryable=False
+                ) from e
+            self._logger.warning(
+                "STT stream error (%s), reconnecting in %.2fs (attempt %d/%d)",
+                e, delay, failures, _STT_RECONNECT_ATTEMPTS,
+            )
+            await asyncio.sleep(delay)
+        else:
             # Stream completed normally — check if input channel is still open
             if self._input_ch.closed:
                 break  # Session ended, stop
             self._logger.info("STT stream ended, reconnecting...")
-            # Create a fresh HTTP session for the new connection
-            if self._session.closed:
-                self._session = aiohttp.ClientSession()
-        except Exception:
-            # Let the original retry logic handle errors
-            await _orig_stt_run(self)
-            break
+        # Reconnect on the job's shared HTTP session (the same keep-alive
+        # pool Sarvam TTS uses) rather than opening a private one
+        if self._session.closed:
+            self._session = utils.http_context.http_session()
 
 _SarvamSpeechStream._run = _patched_stt_run
 
@@ -97,32 +176,145 @@ _SarvamSynthStream._run = _patched_tts_run
 # Default Claude model — configurable via CLAUDE_MODEL env var
 CLAUDE_MODEL = os.environ.get("CLAUDE_MODEL", "claude-haiku-4-5-20251001")
 
+# Project root, resolved once at import; logs/ and transcripts/ live under it.
+BASE_DIR = Path(__file__).resolve().parent
+
 
 # ---------------------------------------------------------------------------
 # Per-call file logger — saves all logs for each call session to logs/ dir
 # ---------------------------------------------------------------------------
-def _setup_call_logger(store_name: str) -> tuple[logging.FileHandler, str]:
-    """Create a per-call log file and attach a file handler to the root logger.
+LOGS_DIR = BASE_DIR / "logs"
 
-    Returns (handler, log_filepath) so the handler can be removed when the call ends.
+
+class _BufferedFileHandler(logging.FileHandler):
+    """FileHandler that leaves flushing to its owner.
+
+    StreamHandler.emit flushes after every record; here records accumulate
+    in the file object's buffer until flush() is called. The buffer is sized
+    so a whole LLM turn (including a DEBUG message dump) fits in one write.
     """
-    logs_dir = Path(__file__).parent / "logs"
-    logs_dir.mkdir(exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = logs_dir / f"{store_name.replace(' ', '_')}_{ts}.log"
 
-    handler = logging.FileHandler(str(log_file), encoding="utf-8")
-    handler.setLevel(logging.DEBUG)
-    handler.setFormatter(logging.Formatter(
+    buffer_size = 64 * 1024
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _DrainFlushListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue runs dry.
+
+    A burst of records (e.g. an LLM turn) becomes one write to disk, while
+    an idle call still has everything on disk within one record's latency —
+    the dashboard tails this file while the call is live.
+    """
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+class _CallLogHandler(logging.handlers.QueueHandler):
+    """Root-logger handler that hands records to a background file writer.
+
+    Logging from the event loop (llm_node, transcript hooks) is a queue put;
+    a QueueListener thread does the disk writes. The handler can be attached
+    before its file is open: records queue up until start() hands them to
+    the file. flush() waits for the queue to drain, and close() stops the
+    listener and closes the file.
+    """
+
+    def __init__(self):
+        super().__init__(queue.Queue())
+        self._file_handler = None
+        self._listener = None
+
+    def start(self, file_handler: logging.FileHandler):
+        """Write queued and future records to file_handler."""
+        self._file_handler = file_handler
+        self._listener = _DrainFlushListener(self.queue, file_handler)
+        self._listener.start()
+
+    def flush(self):
+        if self._listener is not None:
+            self.queue.join()
+            self._file_handler.flush()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()  # drains queued records before returning
+            self._listener = None
+            self._file_handler.close()
+        super().close()
+
+
+def _open_call_log(store_name: str) -> tuple[logging.FileHandler, str]:
+    """Create the per-call log file under LOGS_DIR.
+
+    Returns (file_handler, log_filepath). Does disk I/O — the entrypoint
+    runs it on a worker thread.
+    """
+    LOGS_DIR.mkdir(exist_ok=True)
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    log_file = LOGS_DIR / f"{store_name.replace(' ', '_')}_{ts}.log"
+
+    file_handler = _BufferedFileHandler(str(log_file), encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(
         "%(asctime)s [%(name)s] %(levelname)s: %(message)s",
         datefmt="%H:%M:%S",
     ))
+    return file_handler, str(log_file)
+
+
+def _attach_call_log_handler() -> _CallLogHandler:
+    """Attach a not-yet-started _CallLogHandler to the root logger.
+
+    On the root logger it captures logs from all livekit.* loggers too.
+    """
+    handler = _CallLogHandler()
+    handler.setLevel(logging.DEBUG)
+    logging.getLogger().addHandler(handler)
+    return handler
 
-    # Attach to root logger so it captures logs from all livekit.* loggers too
-    root = logging.getLogger()
-    root.addHandler(handler)
-    logger.info(f"[LOG] Per-call log file: {log_file}")
-    return handler, str(log_file)
+
+def _discard_opened_call_log(task: asyncio.Task) -> None:
+    """Done-callback for an _open_call_log task whose call never started."""
+    if not task.cancelled() and task.exception() is None:
+        task.result()[0].close()
+
+
+async def _setup_call_logger(store_name: str, connecting: Awaitable | None = None) -> tuple[_CallLogHandler, str]:
+    """Create a per-call log file and attach a queued handler to the root logger.
+
+    The handler is attached first and the file is opened on a worker thread
+    while `connecting` (the entrypoint's ctx.connect()) runs, so records
+    logged during connect are queued and written once the file is open. If
+    either fails, the handler is detached and closed before re-raising.
+
+    Returns (handler, log_filepath) so the handler can be removed when the call ends.
+    """
+    handler = _attach_call_log_handler()
+    open_log = asyncio.create_task(asyncio.to_thread(_open_call_log, store_name))
+    try:
+        if connecting is not None:
+            await connecting
+        file_handler, log_path = await open_log
+    except BaseException:
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+        open_log.add_done_callback(_discard_opened_call_log)
+        raise
+    handler.start(file_handler)
+    logger.info("[LOG] Per-call log file: %s", log_path)
+    return handler, log_path
 
 
 # ---------------------------------------------------------------------------
@@ -131,7 +323,8 @@ def _setup_call_logger(store_name: str) -> tuple[logging.FileHandler, str]:
 class SanitizedAgent(Agent):
     """Agent subclass that intercepts every LLM call to:
     1. Sanitize message ordering (vLLM/Qwen requires user-first after system)
-    2. Log the exact messages sent to the LLM for debugging
+    2. Log the request shape (message count and roles); the full message
+       list only at DEBUG
     3. Strip <think>...</think> tags from Qwen3 output before TTS
     4. Clean up output for TTS (action markers, spacing)
     """
@@ -151,43 +344,51 @@ class SanitizedAgent(Agent):
         return "Call ended. Thank you."
 
     async def llm_node(self, chat_ctx, tools, model_settings):
-        # Reset text accumulator for this LLM turn
+        # Reset text accumulator for this LLM turn — chunks are collected in a
+        # list and joined once the stream ends
         self._last_response_text = ""
+        response_chunks: list[str] = []
 
         # --- Sanitize chat context ---
         chat_ctx = self._sanitize_chat_ctx(chat_ctx)
 
         # --- Annotate interrupted (truncated) assistant messages ---
         for item in chat_ctx.items:
-            if (getattr(item, "role", None) == "assistant"
-                    and getattr(item, "interrupted", False)):
-                text = (item.text_content or "").strip()
-                if text and not text.endswith("[interrupted]"):
-                    item.content = [text + " [interrupted]"]
-
-        # --- Log FULL message tree sent to the LLM ---
-        try:
-            messages, _ = chat_ctx.to_provider_format("openai")
-            logger.info(f"[LLM REQUEST] {len(messages)} messages")
-            logger.info(f"[LLM MESSAGES]\n{json.dumps(messages, indent=2, ensure_ascii=False)}")
-        except Exception as e:
-            logger.warning(f"[LLM REQUEST] failed to log messages: {e}")
+            # Function calls/outputs have no role — check the item type first
+            if item.type != "message" or item.role != "assistant" or not item.interrupted:
+                continue
+            text = (item.text_content or "").strip()
+            if text and not text.endswith("[interrupted]"):
+                item.content = [text + " [interrupted]"]
+
+        # --- Log the request shape; the FULL message tree only at DEBUG ---
+        if logger.isEnabledFor(logging.INFO):
+            roles = [item.role for item in chat_ctx.items if item.type == "message"]
+            logger.info("[LLM REQUEST] %d messages, roles=%s", len(roles), roles)
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                messages, _ = chat_ctx.to_provider_format("openai")
+                logger.debug("[LLM MESSAGES]\n%s", json.dumps(messages, indent=2, ensure_ascii=False))
+            except Exception as e:
+                logger.warning("[LLM REQUEST] failed to log messages: %s", e)
 
         # --- Forward to default LLM node, cleaning output for TTS ---
-        # Use buffered normalizer to prevent number splitting across chunks.
+        # Use buffered normalizer to prevent number splitting across chunks
+        # and to normalize whole clauses rather than single tokens.
         # E.g. "28" + "000" → "attaaees hazaar" (not "attaaees" + "zero")
         normalizer = _NumberBufferedNormalizer()
+        think_filter = _ThinkTagFilter()
         async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
             if isinstance(chunk, str):
-                chunk = _strip_think_tags(chunk)
+                chunk = think_filter.process(chunk)
                 chunk = normalizer.process(chunk)
                 if chunk.strip():  # skip empty chunks but preserve leading/trailing spaces
-                    self._last_response_text += chunk
+                    response_chunks.append(chunk)
                     yield chunk
             elif hasattr(chunk, "delta") and isinstance(getattr(chunk.delta, "content", None), str):
-                chunk.delta.content = _strip_think_tags(chunk.delta.content)
+                chunk.delta.content = think_filter.process(chunk.delta.content)
                 chunk.delta.content = normalizer.process(chunk.delta.content)
-                self._last_response_text += chunk.delta.content
+                response_chunks.append(chunk.delta.content)
                 yield chunk
             else:
                 yield chunk
@@ -195,18 +396,19 @@ class SanitizedAgent(Agent):
         # Flush any remaining buffered digits at end of stream
         remainder = normalizer.flush()
         if remainder.strip():
-            self._last_response_text += remainder
+            response_chunks.append(remainder)
             yield remainder
+        self._last_response_text = "".join(response_chunks)
 
         # --- Log FULL LLM response + detect character breaks ---
         if self._last_response_text:
-            logger.info(f"[LLM RESPONSE] {self._last_response_text}")
+            logger.info("[LLM RESPONSE] %s", self._last_response_text)
             if _is_character_break(self._last_response_text):
                 global _fallback_idx
                 fallback = _HINDI_FALLBACKS[_fallback_idx % len(_HINDI_FALLBACKS)]
                 _fallback_idx += 1
                 logger.warning(
-                    f"[CHARACTER BREAK RECOVERY] Replacing English response with: '{fallback}'"
+                    "[CHARACTER BREAK RECOVERY] Replacing English response with: '%s'", fallback
                 )
                 # Yield the Hindi fallback — the English chunks already yielded
                 # will be followed by this, but the TTS will crash on the English
@@ -219,52 +421,87 @@ class SanitizedAgent(Agent):
         """Ensure first non-system message is from the user.
         Required by vLLM/Qwen. If the first non-system message is assistant
         (e.g. the greeting), inject a synthetic user message before it instead
-        of stripping it — this preserves the greeting as conversational anchor."""
-        ctx = chat_ctx.copy()
-        items = ctx.items
-
+        of stripping it — this preserves the greeting as conversational anchor.
+        The context is only copied when a message actually has to be inserted."""
         # Find first ChatMessage that isn't system
-        for i, item in enumerate(items):
+        for i, item in enumerate(chat_ctx.items):
             if getattr(item, "type", None) != "message":
                 continue
             if item.role == "system":
                 continue
             # First non-system message found
-            if item.role != "user":
-                logger.info(
-                    f"[SANITIZE] First non-system message is role='{item.role}'. "
-                    f"Injecting synthetic user message before it to satisfy user-first requirement."
-                )
-                synthetic = llm.ChatMessage(
-                    role="user",
-                    content=["[call connected]"],
-                )
-                items.insert(i, synthetic)
-            break
+            if item.role == "user":
+                return chat_ctx
+            logger.info(
+                "[SANITIZE] First non-system message is role='%s'. "
+                "Injecting synthetic user message before it to satisfy user-first requirement.",
+                item.role,
+            )
+            ctx = chat_ctx.copy()
+            ctx.items.insert(i, llm.ChatMessage(
+                role="user",
+                content=["[call connected]"],
+            ))
+            return ctx
 
-        return ctx
+        return chat_ctx
 
 
 # Regex to strip Qwen3 thinking blocks from streamed text (only applies when using Qwen LLM)
-_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
-_THINK_OPEN_RE = re.compile(r"<think>.*", re.DOTALL)
+# A closed block, or an unclosed one (streaming) running to the end of the text.
+_THINK_RE = re.compile(r"<think>(?:.*?</think>|.*)", re.DOTALL)
 
 
 def _strip_think_tags(text: str) -> str:
     """Remove <think>...</think> blocks from Qwen3 output so TTS doesn't read them."""
-    text = _THINK_RE.sub("", text)
-    text = _THINK_OPEN_RE.sub("", text)  # handle unclosed tag (streaming)
-    return text
+    if "<think>" not in text:
+        return text
+    return _THINK_RE.sub("", text)
+
+
+class _ThinkTagFilter:
+    """Drop <think>...</think> blocks from a stream of LLM chunks.
+
+    Unlike _strip_think_tags, which only sees one chunk, this remembers
+    whether the stream is inside a think block, so reasoning that spans
+    several chunks is dropped up to and including the closing tag.
+    """
+
+    def __init__(self):
+        self._in_think = False
+
+    def process(self, chunk: str) -> str:
+        # Common case: not thinking and no opener in this chunk
+        if not self._in_think and "<think>" not in chunk:
+            return chunk
+        out = []
+        while chunk:
+            if self._in_think:
+                end = chunk.find("</think>")
+                if end < 0:
+                    break
+                chunk = chunk[end + len("</think>"):]
+                self._in_think = False
+            else:
+                start = chunk.find("<think>")
+                if start < 0:
+                    out.append(chunk)
+                    break
+                out.append(chunk[:start])
+                chunk = chunk[start + len("<think>"):]
+                self._in_think = True
+        return "".join(out)
 
 
 # Hindi/Hinglish marker words — if a response >20 chars has NONE of these,
 # it's likely a character break (LLM responded in pure English).
-_HINDI_MARKERS = {
+_HINDI_MARKERS = frozenset({
     "achha", "ji", "haan", "theek", "kya", "hai", "mein", "nahi", "bhai",
     "aur", "aap", "yeh", "woh", "ke", "ka", "ki", "se", "ko", "pe",
     "toh", "bahut", "abhi", "saal", "hazaar", "lakh", "paisa", "rupees",
     "namaskar", "namaste", "dhanyavaad", "shukriya", "bilkul",
-}
+})
+_LATIN_WORD_RE = re.compile(r"[a-z]+")
 
 
 def _is_character_break(text: str) -> bool:
@@ -272,23 +509,26 @@ def _is_character_break(text: str) -> bool:
     cleaned = text.strip().lower()
     if len(cleaned) <= 20:
         return False
-    words = set(re.findall(r"[a-z]+", cleaned))
-    return not bool(words & _HINDI_MARKERS)
+    # Stop at the first marker word; a Hinglish reply usually has one early.
+    for m in _LATIN_WORD_RE.finditer(cleaned):
+        if m.group() in _HINDI_MARKERS:
+            return False
+    return True
 
 
 def _check_character_break(text: str) -> None:
     """Log a warning if the LLM response appears to be in English instead of Romanized Hindi."""
     if _is_character_break(text):
         logger.warning(
-            f"[CHARACTER BREAK] LLM response appears to be in English "
-            f"(no Hindi markers found): '{text[:100]}...'"
+            "[CHARACTER BREAK] LLM response appears to be in English "
+            "(no Hindi markers found): '%s...'", text[:100]
         )
 
 
 # ---------------------------------------------------------------------------
 # STT garbage detection — heuristic filter for garbled transcripts
 # ---------------------------------------------------------------------------
-_GARBAGE_PATTERNS = {"table", "the", "and", "a", "an", "it", "is", "to", "of", "i", "in"}
+_GARBAGE_PATTERNS = frozenset({"table", "the", "and", "a", "an", "it", "is", "to", "of", "i", "in"})
 
 
 def _is_likely_garbage(text: str) -> bool:
@@ -297,12 +537,12 @@ def _is_likely_garbage(text: str) -> bool:
     Detects single-word transcripts that are common STT artifacts when
     there's background noise or unclear speech.
     """
-    words = text.strip().rstrip('.!?,').lower().split()
-    if not words:
-        return True
-    if len(words) == 1 and words[0] in _GARBAGE_PATTERNS:
+    word = text.strip().rstrip('.!?,').rstrip()
+    if not word:
         return True
-    return False
+    if " " in word:  # several words — the usual case, decided without lowering
+        return False
+    return word.lower() in _GARBAGE_PATTERNS
 
 
 # Canned Hindi fallback responses for character break recovery
@@ -324,49 +564,71 @@ _fallback_idx = 0
 
 _ACTION_RE = re.compile(r"[\*\(\[][a-zA-Z\s]+[\*\)\]]")
 
-# Regex to detect trailing digits at end of a chunk
-_TRAILING_DIGITS_RE = re.compile(r"(\d+)$")
-# Regex to detect leading digits at start of a chunk
-_LEADING_DIGITS_RE = re.compile(r"^(\d+)")
+# Buffered text is released up to the last clause end (punctuation followed
+# by whitespace, or sentence punctuation ending the buffer), or — once it
+# grows past _COALESCE_CHARS or has been held for _COALESCE_SECONDS — up to
+# the last word boundary. Either way the released text never ends mid-number:
+# a trailing "." right after a digit may still be a decimal point.
+_CLAUSE_PREFIX_RE = re.compile(r".*(?:[.!?,।॥](?=\s)|(?:[!?।॥]|(?<!\d)\.)\Z)", re.DOTALL)
+_WORD_PREFIX_RE = re.compile(r".*\S(?=\s)", re.DOTALL)
+_COALESCE_CHARS = 48
+_COALESCE_SECONDS = 0.2
 
 
 class _NumberBufferedNormalizer:
-    """Buffer trailing digits across streaming chunks to prevent number splitting.
+    """Coalesce streamed chunks into clauses before normalizing them.
 
     Problem: LLM token boundaries can split "28000" into "28" + "000".
     Per-chunk normalization converts these independently to "attaaees" + "zero"
-    instead of "attaaees hazaar".
-
-    Solution: If a chunk ends with digits, hold them in a buffer. When the next
-    chunk arrives, prepend the buffer. On stream end, flush remaining buffer.
+    instead of "attaaees hazaar". Normalizing every token separately also
+    runs the whole pipeline once per token.
+
+    Solution: Buffer chunks and only normalize up to the last clause end
+    (".", ",", "?", ... followed by whitespace, or a sentence end closing the
+    buffer), or up to the last word boundary once the buffer passes
+    _COALESCE_CHARS or has been held for _COALESCE_SECONDS. The deadline is
+    checked as chunks arrive. The rest is held for the next chunk. On stream
+    end, flush remaining buffer.
     """
 
     def __init__(self):
         self._buffer = ""
+        self._held_since = 0.0
+        # Offsets before which the buffer is known to hold no clause end /
+        # word boundary, so a long unbroken run (e.g. a digit stream) is not
+        # rescanned from the start on every chunk.
+        self._clause_from = 0
+        self._word_from = 0
 
     def process(self, chunk: str) -> str:
-        """Process a streaming chunk, buffering trailing digits.
+        """Process a streaming chunk, buffering any incomplete clause.
 
         Returns the normalized text ready for TTS, or empty string if
         the entire chunk was buffered.
         """
-        # Prepend any buffered digits from the previous chunk
-        chunk = self._buffer + chunk
-        self._buffer = ""
-
-        # Check if the chunk ends with digits — buffer them for the next chunk
-        m = _TRAILING_DIGITS_RE.search(chunk)
-        if m:
-            self._buffer = m.group(1)
-            chunk = chunk[:m.start()]
-
-        # Normalize whatever we can emit now
-        if chunk:
-            return _normalize_for_tts(chunk)
-        return ""
+        now = time.monotonic()
+        if not self._buffer:
+            self._held_since = now
+        self._buffer += chunk
+        buf = self._buffer
+        m = _CLAUSE_PREFIX_RE.match(buf, self._clause_from)
+        if m is None and (len(buf) >= _COALESCE_CHARS or now - self._held_since >= _COALESCE_SECONDS):
+            m = _WORD_PREFIX_RE.match(buf, self._word_from)
+            if m is None:
+                self._word_from = max(len(buf) - 1, 0)
+        if m is None:
+            # The last character may still pair with the next chunk's
+            # leading whitespace, so resume one character back.
+            self._clause_from = max(len(buf) - 1, 0)
+            return ""
+        head, self._buffer = buf[:m.end()], buf[m.end():]
+        self._clause_from = self._word_from = 0
+        self._held_since = now
+        return _normalize_for_tts(head)
 
     def flush(self) -> str:
-        """Flush any remaining buffered digits at end of stream."""
+        """Flush any remaining buffered text at end of stream."""
+        self._clause_from = self._word_from = 0
         if self._buffer:
             result = _normalize_for_tts(self._buffer)
             self._buffer = ""
@@ -409,147 +671,190 @@ _DEVANAGARI_MAP = {
 # Devanagari consonants have an inherent 'a' vowel. When followed by a matra
 # (dependent vowel sign), the matra replaces the inherent 'a'. When followed by
 # halant (्), the inherent 'a' is suppressed entirely.
-_DEVANAGARI_CONSONANTS = set(
-    'कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह'
-    'क़ख़ग़ज़ड़ढ़फ़'
-)
+# The nukta forms (क़, ज़, ...) are a base consonant plus U+093C, so the base
+# consonant here already covers them.
+_DEVANAGARI_CONSONANTS = frozenset('कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह')
 # Matras (dependent vowel signs) — replace the inherent 'a' of the preceding consonant
-_DEVANAGARI_MATRAS = {
+_DEVANAGARI_MATRAS = frozenset({
     'ा', 'ि', 'ी', 'ु', 'ू', 'ृ', 'े', 'ै', 'ो', 'ौ',
-}
+})
+
+# Translation tables are built once at import. Every codepoint in the
+# Devanagari block maps through _DEVANAGARI_MAP, and unmapped ones are
+# dropped. Consonants followed by a matra or halant are first rewritten to
+# their bare form (no inherent 'a') by a regex, and str.translate handles
+# everything else in C.
+#
+# The translate table is a codepoint-indexed tuple rather than a dict:
+# everything below U+0900 maps to itself, and anything past U+097F raises
+# IndexError, which str.translate treats as "leave unchanged".
+_DEVANAGARI_RE = re.compile(r'[\u0900-\u097F]')
+_DEVANAGARI_TABLE = (
+    tuple(chr(cp) for cp in range(0x0900))
+    + tuple(_DEVANAGARI_MAP.get(chr(cp)) for cp in range(0x0900, 0x0980))
+)
+_DEVANAGARI_BARE = {ch: _DEVANAGARI_MAP[ch][:-1] for ch in sorted(_DEVANAGARI_CONSONANTS)}
+_BARE_CONSONANT_RE = re.compile(
+    '[' + ''.join(_DEVANAGARI_BARE) + ']'
+    '(?=[' + ''.join(sorted(_DEVANAGARI_MATRAS)) + '्])'
+)
+
 
 def _transliterate_devanagari(text: str) -> str:
     """Replace any Devanagari characters with Romanized equivalents.
-    Fast single-pass — only activates if Devanagari is detected.
-    Handles consonant+matra combinations correctly (matra replaces inherent 'a')."""
+    Only activates if Devanagari is detected. Handles consonant+matra
+    combinations correctly (matra replaces inherent 'a')."""
     # Quick check: skip if no Devanagari present (common case)
-    if not any('\u0900' <= c <= '\u097F' for c in text):
+    if _DEVANAGARI_RE.search(text) is None:
         return text
-    result = []
-    i = 0
-    while i < len(text):
-        ch = text[i]
-        if '\u0900' <= ch <= '\u097F':
-            roman = _DEVANAGARI_MAP.get(ch, '')
-            # If this is a consonant, check if next char is a matra or halant
-            if ch in _DEVANAGARI_CONSONANTS and roman.endswith('a'):
-                if i + 1 < len(text):
-                    next_ch = text[i + 1]
-                    if next_ch in _DEVANAGARI_MATRAS or next_ch == '्':
-                        # Strip inherent 'a' — the matra/halant will provide the vowel
-                        roman = roman[:-1]
-            result.append(roman)
-        else:
-            result.append(ch)
-        i += 1
-    return ''.join(result)
+    text = _BARE_CONSONANT_RE.sub(lambda m: _DEVANAGARI_BARE[m[0]], text)
+    return text.translate(_DEVANAGARI_TABLE)
 
 # Hindi number words
-_HINDI_ONES = {
-    0: "", 1: "ek", 2: "do", 3: "teen", 4: "chaar", 5: "paanch",
-    6: "chheh", 7: "saat", 8: "aath", 9: "nau", 10: "das",
-    11: "gyaarah", 12: "baarah", 13: "terah", 14: "chaudah", 15: "pandrah",
-    16: "solah", 17: "satrah", 18: "athaarah", 19: "unees", 20: "bees",
-    21: "ikkees", 22: "baaees", 23: "teyees", 24: "chaubees", 25: "pachchees",
-    26: "chhabbees", 27: "sattaaees", 28: "attaaees", 29: "untees", 30: "tees",
-    31: "ikattees", 32: "battees", 33: "taintees", 34: "chauntees", 35: "paintees",
-    36: "chhatees", 37: "saintees", 38: "adtees", 39: "untaalees", 40: "chaalees",
-    41: "iktaalees", 42: "bayaalees", 43: "taintaalees", 44: "chauvaalees", 45: "paintaalees",
-    46: "chhiyaalees", 47: "saintaalees", 48: "adtaalees", 49: "unchaas", 50: "pachaas",
-    51: "ikyaavan", 52: "baavan", 53: "tirpan", 54: "chauvan", 55: "pachpan",
-    56: "chhappan", 57: "sattaavan", 58: "atthaavan", 59: "unsath", 60: "saath",
-    61: "iksath", 62: "baasath", 63: "tirsath", 64: "chaunsath", 65: "painsath",
-    66: "chhiyaasath", 67: "sadsath", 68: "adsath", 69: "unhattar", 70: "sattar",
-    71: "ikhattar", 72: "bahattar", 73: "tihattar", 74: "chauhattar", 75: "pachhattar",
-    76: "chhihattar", 77: "satattar", 78: "athattar", 79: "unaasi", 80: "assi",
-    81: "ikyaasi", 82: "bayaasi", 83: "tiraasi", 84: "chauraasi", 85: "pachaasi",
-    86: "chhiyaasi", 87: "sataasi", 88: "athaasi", 89: "navaasi", 90: "nabbe",
-    91: "ikyaanbe", 92: "baanbe", 93: "tirranbe", 94: "chauranbe", 95: "pachranbe",
-    96: "chhiyanbe", 97: "sattanbe", 98: "atthanbe", 99: "ninyanbe",
-}
-
+# Index n holds the word for n (0 ≤ n ≤ 99); a tuple index, no hashing.
+_HINDI_ONES = (
+    "", "ek", "do", "teen", "chaar",
+    "paanch", "chheh", "saat", "aath", "nau",
+    "das", "gyaarah", "baarah", "terah", "chaudah",
+    "pandrah", "solah", "satrah", "athaarah", "unees",
+    "bees", "ikkees", "baaees", "teyees", "chaubees",
+    "pachchees", "chhabbees", "sattaaees", "attaaees", "untees",
+    "tees", "ikattees", "battees", "taintees", "chauntees",
+    "paintees", "chhatees", "saintees", "adtees", "untaalees",
+    "chaalees", "iktaalees", "bayaalees", "taintaalees", "chauvaalees",
+    "paintaalees", "chhiyaalees", "saintaalees", "adtaalees", "unchaas",
+    "pachaas", "ikyaavan", "baavan", "tirpan", "chauvan",
+    "pachpan", "chhappan", "sattaavan", "atthaavan", "unsath",
+    "saath", "iksath", "baasath", "tirsath", "chaunsath",
+    "painsath", "chhiyaasath", "sadsath", "adsath", "unhattar",
+    "sattar", "ikhattar", "bahattar", "tihattar", "chauhattar",
+    "pachhattar", "chhihattar", "satattar", "athattar", "unaasi",
+    "assi", "ikyaasi", "bayaasi", "tiraasi", "chauraasi",
+    "pachaasi", "chhiyaasi", "sataasi", "athaasi", "navaasi",
+    "nabbe", "ikyaanbe", "baanbe", "tirranbe", "chauranbe",
+    "pachranbe", "chhiyanbe", "sattanbe", "atthanbe", "ninyanbe",
+)
+assert len(_HINDI_ONES) == 100
 
-def _number_to_hindi(n: int) -> str:
-    """Convert an integer to Hindi word form."""
-    if n == 0:
-        return "zero"
-    if n < 0:
-        return "minus " + _number_to_hindi(-n)
 
+def _spell_below_lakh(n: int) -> str:
+    """Hindi words for 1 ≤ n ≤ 99999, without recursion."""
     parts = []
-    if n >= 10000000:  # crore
-        parts.append(_number_to_hindi(n // 10000000) + " crore")
-        n %= 10000000
-    if n >= 100000:  # lakh
-        parts.append(_number_to_hindi(n // 100000) + " lakh")
-        n %= 100000
-    if n >= 1000:  # hazaar
-        thousands = n // 1000
-        remainder = n % 1000
-        if remainder == 500:
+    thousands, n = divmod(n, 1000)
+    if thousands:
+        if n == 500:
             # Natural Hindi: 37500 → "saadhe saintees hazaar" (not "saintees hazaar paanch sau")
             if thousands == 1:
-                parts.append("dedh hazaar")
-            elif thousands == 2:
-                parts.append("dhaai hazaar")
-            else:
-                parts.append("saadhe " + _number_to_hindi(thousands) + " hazaar")
-            n = 0  # fully consumed
-        else:
-            parts.append(_number_to_hindi(thousands) + " hazaar")
-            n = remainder
+                return "dedh hazaar"
+            if thousands == 2:
+                return "dhaai hazaar"
+            return "saadhe " + _HINDI_ONES[thousands] + " hazaar"
+        parts.append(_HINDI_ONES[thousands] + " hazaar")
     if n >= 100:  # sau
         parts.append(_HINDI_ONES[n // 100] + " sau")
         n %= 100
     if n > 0:
         parts.append(_HINDI_ONES[n])
+    return " ".join(parts)
 
+
+# Nearly every price, quantity and warranty term is below 10000, so those are
+# a straight tuple index; larger numbers split into crore and lakh groups
+# plus a sub-lakh remainder spelled directly.
+_HINDI_BELOW_10K = ("zero",) + tuple(_spell_below_lakh(n) for n in range(1, 10000))
+
+
+@lru_cache(maxsize=1024)
+def _number_to_hindi(n: int) -> str:
+    """Convert an integer to Hindi word form.
+
+    Cached: the same prices and quantities recur across chunks and turns
+    of a call. Only negatives and crore counts recurse."""
+    if 0 <= n < 10000:
+        return _HINDI_BELOW_10K[n]
+    if n < 0:
+        return "minus " + _number_to_hindi(-n)
+
+    parts = []
+    crores, n = divmod(n, 10000000)
+    if crores:
+        parts.append(_number_to_hindi(crores) + " crore")
+    lakhs, n = divmod(n, 100000)
+    if lakhs:
+        parts.append(_HINDI_ONES[lakhs] + " lakh")
+    if n:
+        parts.append(_HINDI_BELOW_10K[n] if n < 10000 else _spell_below_lakh(n))
     return " ".join(parts)
 
 
 # Match standalone numbers: integers and decimals (not inside words)
 _NUMBER_RE = re.compile(r"\b(\d[\d,]*\.?\d*)\b")
+_DIGIT_RE = re.compile(r"\d")
+
+
+def _number_repl(m: re.Match) -> str:
+    """_NUMBER_RE substitution callback — one matched number to Hindi words."""
+    raw = m.group(1).replace(",", "")
+    # Handle decimals: "1.5" → "dedh" (special case) or "ek point paanch"
+    if "." in raw:
+        if raw == "1.5":
+            return "dedh"
+        if raw == "2.5":
+            return "dhaai"
+        int_part, dec_part = raw.split(".", 1)
+        result = _number_to_hindi(int(int_part)) if int_part else ""
+        result += " point " + " ".join(_HINDI_ONES[int(d)] for d in dec_part if d.isdigit())
+        return result.strip()
+    try:
+        return _number_to_hindi(int(raw))
+    except (ValueError, IndexError):
+        return m.group(0)  # leave as-is if conversion fails
 
 
 def _replace_numbers(text: str) -> str:
     """Replace digit numbers with Hindi words for natural TTS pronunciation."""
-    def _repl(m):
-        raw = m.group(1).replace(",", "")
-        # Handle decimals: "1.5" → "dedh" (special case) or "ek point paanch"
-        if "." in raw:
-            if raw == "1.5":
-                return "dedh"
-            if raw == "2.5":
-                return "dhaai"
-            int_part, dec_part = raw.split(".", 1)
-            result = _number_to_hindi(int(int_part)) if int_part else ""
-            result += " point " + " ".join(_HINDI_ONES[int(d)] for d in dec_part if d.isdigit())
-            return result.strip()
-        try:
-            return _number_to_hindi(int(raw))
-        except (ValueError, KeyError):
-            return m.group(0)  # leave as-is if conversion fails
-    return _NUMBER_RE.sub(_repl, text)
+    if _DIGIT_RE.search(text) is None:
+        return text
+    return _NUMBER_RE.sub(_number_repl, text)
+
+
+# Spacing fixes, all replaced with a single space. The transitions are
+# zero-width so adjacent fixes can't consume each other's characters:
+#   lowercase→uppercase        "puraneAC" → "purane AC"
+#   letter→digit, digit→letter "5star"    → "5 star"
+#   whitespace runs, newlines  "a.\n\nB"  → "a. B"
+# Single spaces are left alone so streaming chunk boundaries keep their
+# leading/trailing space.
+_TTS_SPACING_RE = re.compile(
+    r"\s{2,}|[^\S ]"
+    r"|(?<=[a-z])(?=[A-Z])"
+    r"|(?<=[a-zA-Z])(?=\d)"
+    r"|(?<=\d)(?=[a-zA-Z])"
+)
+
 
+# Anything one of the passes below could rewrite: an action-marker opener,
+# a digit, Devanagari, a lowercase→uppercase pair, or whitespace other than
+# single spaces. Most streamed chunks (" hai", " kya") contain none of these.
+_TTS_FASTPATH_RE = re.compile(r"[*(\[\d\u0900-\u097F]|[a-z][A-Z]|[^\S ]|  ")
 
+
+@lru_cache(maxsize=2048)
 def _normalize_for_tts(text: str) -> str:
-    """Clean up LLM output for TTS — strip markers, fix spacing, convert numbers."""
+    """Clean up LLM output for TTS — strip markers, fix spacing, convert numbers.
+
+    Cached: streamed chunks are short and repeat heavily within a call."""
+    if _TTS_FASTPATH_RE.search(text) is None:
+        return text
     # Strip roleplay action markers
     text = _ACTION_RE.sub("", text)
-    # Replace newlines with spaces (LLM sometimes inserts \n\n between sentences)
-    text = text.replace("\n", " ")
     # Transliterate any Devanagari that leaked through the LLM (safety net)
     text = _transliterate_devanagari(text)
     # Convert digit numbers to Hindi words
     text = _replace_numbers(text)
-    # Insert space between lowercase→uppercase transitions (fixes "puraneAC" → "purane AC")
-    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
-    # Insert space before digit→letter or letter→digit transitions (fixes "5star" → "5 star")
-    text = re.sub(r"([a-zA-Z])(\d)", r"\1 \2", text)
-    text = re.sub(r"(\d)([a-zA-Z])", r"\1 \2", text)
-    # Collapse multiple spaces
-    text = re.sub(r" {2,}", " ", text)
-    return text
+    # Fix spacing and flatten whitespace (LLM sometimes inserts \n\n between
+    # sentences) in one pass
+    return _TTS_SPACING_RE.sub(" ", text)
 
 # ---------------------------------------------------------------------------
 # Conversation prompt
@@ -648,6 +953,27 @@ You: "Achha 1 saal. Delivery kitne din mein hogi?"
 You: "Theek hai ji, main soch ke bataata hoon. Dhanyavaad." → then call end_call tool
 """
 
+# Per-call context appended after DEFAULT_INSTRUCTIONS. Everything that varies
+# between dispatches lives in this suffix, so the system prompt starts with the
+# same byte-identical prefix on every call and provider prefix caches
+# (Anthropic ephemeral caching, vLLM automatic prefix caching) keep hitting.
+_INSTRUCTIONS_CONTEXT = """
+PRODUCT: {product}
+STORE: {store}{area_info}
+
+NOTE: You have already greeted the shopkeeper with: "{greeting}"
+Do NOT repeat the greeting. Continue the conversation from the shopkeeper's response.
+"""
+
+_AREA_INFO = '\nYOUR AREA: {area} — if asked where you live, say "{area} mein rehta hoon" or "{area} side".'
+
+
+def _build_instructions(product: str, store: str, area: str, greeting: str) -> str:
+    """Return DEFAULT_INSTRUCTIONS followed by the per-call product/store context."""
+    area_info = _AREA_INFO.format(area=area) if area else ""
+    return DEFAULT_INSTRUCTIONS + _INSTRUCTIONS_CONTEXT.format(
+        product=product, store=store, area_info=area_info, greeting=greeting,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -662,7 +988,7 @@ def _create_llm():
     provider = os.environ.get("LLM_PROVIDER", "claude").lower()
 
     if provider == "claude":
-        logger.info(f"[LLM] Using Claude ({CLAUDE_MODEL})")
+        logger.info("[LLM] Using Claude (%s)", CLAUDE_MODEL)
         return anthropic.LLM(
             model=CLAUDE_MODEL,
             api_key=os.environ.get("ANTHROPIC_API_KEY"),
@@ -677,7 +1003,229 @@ def _create_llm():
             base_url=os.environ.get("LLM_BASE_URL", "http://192.168.0.42:8000/v1"),
             api_key=os.environ.get("LLM_API_KEY", "unused"),
             temperature=0.7,
+            max_completion_tokens=150,  # same ceiling as Claude — replies are 1-2 lines
+        )
+
+
+# ---------------------------------------------------------------------------
+# Dispatch metadata — parsed and validated once per call
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class DispatchMetadata:
+    """Call parameters sent as JSON metadata on the agent dispatch."""
+    phone: str = ""                        # empty → browser session
+    store_name: str = "Unknown Store"
+    product_description: str = "appliance"
+    nearby_area: str = ""
+    sip_trunk_id: str = ""
+    instructions_override: str | None = None  # pipeline mode: full generated prompt
+    greeting: str | None = None
+    voice_speaker: str = "shubh"
+    voice_pace: float = 1.0
+
+    @classmethod
+    def from_json(cls, raw: str | None) -> "DispatchMetadata":
+        d = orjson.loads(raw) if raw else {}
+        # Only keys present in the metadata are passed on, so anything missing
+        # takes the field default above; unknown keys are ignored.
+        kwargs = {f.name: d[f.name] for f in fields(cls) if f.name in d}
+        # "ac_model" is the pre-pipeline name for the product field
+        if "product_description" not in kwargs and "ac_model" in d:
+            kwargs["product_description"] = d["ac_model"]
+        if "sip_trunk_id" not in kwargs and "SIP_OUTBOUND_TRUNK_ID" in os.environ:
+            kwargs["sip_trunk_id"] = os.environ["SIP_OUTBOUND_TRUNK_ID"]
+        meta = cls(**kwargs)
+        meta.voice_pace = float(meta.voice_pace)
+        return meta
+
+
+# ---------------------------------------------------------------------------
+# Greeting audio — synthesized ahead of time so it plays without TTS latency
+# ---------------------------------------------------------------------------
+async def _synthesize_greeting(tts, text: str) -> list:
+    """Synthesize text with the session TTS and return the audio frames."""
+    frames = []
+    stream = tts.synthesize(text)
+    try:
+        async for ev in stream:
+            frames.append(ev.frame)
+    finally:
+        await stream.aclose()
+    return frames
+
+
+async def _replay_frames(frames: list):
+    """Yield pre-synthesized frames as the audio source for session.say()."""
+    for frame in frames:
+        yield frame
+
+
+# ---------------------------------------------------------------------------
+# Transcript files
+# ---------------------------------------------------------------------------
+TRANSCRIPTS_DIR = BASE_DIR / "transcripts"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Serialize data with orjson and write it to path in a single write.
+
+    orjson returns UTF-8 bytes directly (non-ASCII text such as Hindi is
+    kept as-is), so there is no separate encode step. Output is compact:
+    these files are read by the dashboard and analysis, not by hand.
+    """
+    payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    with open(path, "wb") as f:
+        f.write(payload)
+
+
+def _with_wall_times(lines: list[dict], started_at: datetime, started_mono: float) -> list[dict]:
+    """Turn each transcript line's monotonic "t" stamp into an ISO "time".
+
+    Lines are stamped with time.monotonic() as they arrive — a float read —
+    and only formatted here, once, when the transcript is saved.
+    """
+    stamped = []
+    for line in lines:
+        out = {}
+        for key, value in line.items():
+            if key == "t":
+                out["time"] = (started_at + timedelta(seconds=value - started_mono)).isoformat()
+            else:
+                out[key] = value
+        stamped.append(out)
+    return stamped
+
+
+def _write_transcript_files(data: dict) -> None:
+    """Write a finished call's transcript and its post-call analysis.
+
+    Called via asyncio.to_thread so the disk writes and the analysis run
+    off the event loop. Errors are logged, never raised.
+    """
+    TRANSCRIPTS_DIR.mkdir(exist_ok=True)
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    filename = TRANSCRIPTS_DIR / f"{data['store_name'].replace(' ', '_')}_{ts}.json"
+    try:
+        _write_json(filename, data)
+        logger.info("[TRANSCRIPT] Saved to %s", filename)
+    except Exception as e:
+        logger.error("[TRANSCRIPT] Failed to save: %s", e)
+        return
+
+    # Post-call quality analysis — writes companion .analysis.json
+    try:
+        from call_analysis import analyze_transcript
+        analysis = analyze_transcript(data)
+        analysis_file = filename.with_suffix(".analysis.json")
+        _write_json(analysis_file, analysis)
+        logger.info(
+            "[ANALYSIS] Score: %s, Topics: [%s], Turns: %s",
+            analysis["overall_score"], ", ".join(analysis.get("topics_covered", [])),
+            analysis["turn_count"],
+        )
+    except Exception as e:
+        logger.warning("[ANALYSIS] Post-call analysis failed (non-fatal): %s", e)
+
+
+# ---------------------------------------------------------------------------
+# Hangup — uses the job-scoped LiveKit API client (ctx.api), which is created
+# once per job and closed by the framework, never per hangup
+# ---------------------------------------------------------------------------
+async def _hang_up(job_ctx: JobContext, identity: str) -> None:
+    """Disconnect the SIP participant with the given identity.
+
+    The identity is the one we dialled with, so this is a single targeted
+    RPC; if the callee has already left the room there is nothing to do.
+    """
+    if identity not in job_ctx.room.remote_participants:
+        logger.debug("[HANGUP] %s already left the room", identity)
+        return
+    try:
+        await job_ctx.api.room.remove_participant(
+            api.RoomParticipantIdentity(room=job_ctx.room.name, identity=identity)
         )
+    except Exception as e:
+        logger.debug("[HANGUP] remove_participant(%s) failed: %s", identity, e)
+
+
+async def _abort_dial(job_ctx: JobContext, dial_task: asyncio.Task) -> None:
+    """Call off an outbound SIP call whose agent session failed to start.
+
+    Cancelling the local create_sip_participant await does not stop the
+    INVITE on the server, so the callee would keep ringing, or answer into
+    a room with no agent. Deleting the room ends the SIP leg with it.
+    """
+    dial_task.cancel()
+    try:
+        await job_ctx.delete_room()
+    except Exception as e:
+        logger.warning("[HANGUP] delete_room after a failed session start failed: %s", e)
+
+
+# ---------------------------------------------------------------------------
+# Worker prewarm — runs once per job process, before any dispatch arrives
+# ---------------------------------------------------------------------------
+def _warm_up_vad(vad) -> None:
+    """Run one silent window through the loaded Silero inference session.
+
+    ONNX Runtime sets up its buffers and kernels on a session's first run(),
+    so doing that here keeps it off the first call's audio. The throwaway
+    OnnxModel only holds its own recurrent state; each VADStream starts from
+    a fresh one on the same shared session.
+    """
+    try:
+        model = _SileroOnnxModel(onnx_session=vad._onnx_session, sample_rate=vad._opts.sample_rate)
+        model(np.zeros(model.window_size_samples, dtype=np.float32))
+    except Exception as e:
+        logger.warning("[VAD] warm-up inference skipped: %s", e)
+
+
+def _pin_job_core(spec: str | None) -> int | None:
+    """Pin this job process to one core from a WORKER_CORES spec.
+
+    The spec lists cores as comma-separated numbers or ranges ("2-5",
+    "2,3,6-7"). Each job process picks one of them by pid, so concurrent
+    calls spread over the listed cores while each keeps its VAD inference
+    on a single core. An unparsable spec, or one naming no core this
+    process may run on, logs a warning and leaves affinity alone.
+    Returns the chosen core, or None if the process was not pinned.
+    """
+    if not spec or not hasattr(os, "sched_setaffinity"):
+        return None
+    try:
+        cores = set()
+        for part in spec.split(","):
+            lo, _, hi = part.strip().partition("-")
+            cores.update(range(int(lo), int(hi or lo) + 1))
+    except ValueError:
+        logger.warning("[CPU] ignoring invalid WORKER_CORES=%r", spec)
+        return None
+    cores = sorted(cores & os.sched_getaffinity(0))
+    if not cores:
+        logger.warning("[CPU] WORKER_CORES=%r names no core available to this process", spec)
+        return None
+    core = cores[os.getpid() % len(cores)]
+    os.sched_setaffinity(0, {core})
+    return core
+
+
+def prewarm(proc: JobProcess):
+    """Load the Silero VAD model while the process sits idle in the pool.
+
+    The ONNX weights load, the inference session is built and one silent
+    frame is run through it here instead of on the dispatch path, so a new
+    call doesn't pay for them before the first audio frame can be processed.
+    """
+    _pin_job_core(os.environ.get("WORKER_CORES"))
+
+    vad = silero.VAD.load(
+        min_speech_duration=0.15,    # 150ms — filter out short noise bursts (up from 80ms for fewer false turns)
+        min_silence_duration=0.25,   # 250ms — end-of-speech fires sooner; MultilingualModel guards against mid-sentence pauses
+        prefix_padding_duration=0.2, # 200ms of pre-roll before speech start (down from 500ms default)
+        activation_threshold=0.5,    # default — speech probability to start detection
+    )
+    _warm_up_vad(vad)
+    proc.userdata["vad"] = vad
 
 
 # ---------------------------------------------------------------------------
@@ -688,54 +1236,48 @@ async def entrypoint(ctx: JobContext):
     Called by LiveKit when a dispatch is created for this agent.
     Handles the full lifecycle: connect → dial → converse → hangup.
     """
-    logger.info(f"Agent entrypoint called. Room: {ctx.room.name}")
+    logger.info("Agent entrypoint called. Room: %s", ctx.room.name)
 
     # Parse metadata from the dispatch
-    metadata = json.loads(ctx.job.metadata or "{}")
-    phone_number = metadata.get("phone", "")
-    store_name = metadata.get("store_name", "Unknown Store")
-    product_description = metadata.get("product_description", metadata.get("ac_model", "appliance"))
-    nearby_area = metadata.get("nearby_area", "")
-    sip_trunk_id = metadata.get("sip_trunk_id", os.environ.get("SIP_OUTBOUND_TRUNK_ID", ""))
-    instructions_override = metadata.get("instructions_override")
+    meta = DispatchMetadata.from_json(ctx.job.metadata)
+    phone_number = meta.phone
+    store_name = meta.store_name
+    product_description = meta.product_description
+    nearby_area = meta.nearby_area
+    sip_trunk_id = meta.sip_trunk_id
+    instructions_override = meta.instructions_override
 
     is_browser = not phone_number
-    logger.info(f"{'Browser session' if is_browser else f'Calling {store_name} at {phone_number}'} for {product_description}")
-
-    # Set up per-call log file (captures all agent, LLM, and session logs for this call)
-    call_log_handler, call_log_path = _setup_call_logger(store_name)
+    if is_browser:
+        logger.info("Browser session for %s", product_description)
+    else:
+        logger.info("Calling %s at %s for %s", store_name, phone_number, product_description)
 
-    # Connect agent to the room
-    await ctx.connect()
+    # Per-call log (captures all agent, LLM, and session logs for this call),
+    # opened while the agent connects to the room
+    call_log_handler, call_log_path = await _setup_call_logger(store_name, ctx.connect())
 
     # Build custom instructions with the product, store name, and nearby area
-    greeting = metadata.get("greeting") or f"Hello, yeh {store_name} hai? {product_description} ke baare mein poochna tha."
+    greeting = meta.greeting or f"Hello, yeh {store_name} hai? {product_description} ke baare mein poochna tha."
     if instructions_override:
         # Pipeline mode: use the dynamically generated prompt
         instructions = instructions_override
     else:
         # Default mode: use DEFAULT_INSTRUCTIONS with product metadata
-        area_info = f'\nYOUR AREA: {nearby_area} — if asked where you live, say "{nearby_area} mein rehta hoon" or "{nearby_area} side".' if nearby_area else ""
-        instructions = DEFAULT_INSTRUCTIONS + f"""
-PRODUCT: {product_description}
-STORE: {store_name}{area_info}
-"""
+        instructions = _build_instructions(product_description, store_name, nearby_area, greeting)
 
     # Voice config — read from dispatch metadata (for A/B experiments) or use defaults
-    voice_speaker = metadata.get("voice_speaker", "shubh") if metadata else "shubh"
-    voice_pace = float(metadata.get("voice_pace", 1.0)) if metadata else 1.0
+    voice_speaker = meta.voice_speaker
+    voice_pace = meta.voice_pace
+    tts_sample_rate = 16000 if is_browser else 8000  # 16kHz browser / 8kHz telephony
 
     # Create the agent session with Sarvam STT/TTS + switchable LLM (Claude or Qwen)
     session = AgentSession(
         # Turn detection — multilingual transformer model predicts end-of-utterance
         # using conversation context (supports Hindi). Runs on top of VAD signals.
         turn_detection=MultilingualModel(),
-        # Voice Activity Detection — detect when someone is speaking
-        vad=silero.VAD.load(
-            min_speech_duration=0.15,    # 150ms — filter out short noise bursts (up from 80ms for fewer false turns)
-            min_silence_duration=0.5,    # 500ms — faster turn detection (down from 800ms, Phase A latency target)
-            activation_threshold=0.5,    # default — speech probability to start detection
-        ),
+        # Voice Activity Detection — Silero model preloaded by prewarm()
+        vad=ctx.proc.userdata["vad"],
         # Speech-to-Text — Sarvam saaras:v3 for Hindi/Hinglish
         stt=sarvam.STT(
             language="hi-IN",
@@ -755,7 +1297,7 @@ STORE: {store_name}{area_info}
             pace=voice_pace,
             pitch=0,
             loudness=1.5,
-            speech_sample_rate=16000 if is_browser else 8000,  # 16kHz browser / 8kHz telephony
+            speech_sample_rate=tts_sample_rate,
             enable_preprocessing=True,  # Let Sarvam handle Romanized Hindi → native pronunciation
         ),
         # Interruption handling
@@ -768,30 +1310,62 @@ STORE: {store_name}{area_info}
 
     # ---- Transcript collection & conversation logging ----
     transcript_lines = []  # Collect messages for saving to file
+    # Lines carry a monotonic "t"; converted to ISO "time" on save
+    started_at, started_mono = datetime.now(), time.monotonic()
 
     # Create agent and wire up transcript reference for end_call capture
     agent = SanitizedAgent(instructions=instructions)
     agent._transcript_lines = transcript_lines
     agent._last_response_text = ""
 
+    # Synthesize the greeting while the phone rings (or the browser joins) so
+    # it plays the moment someone is there, instead of waiting on TTS then.
+    greeting_task = None
+    if is_browser or sip_trunk_id:
+        greeting_task = asyncio.create_task(_synthesize_greeting(session.tts, greeting))
+
+    # Place the SIP call before starting the session, so the INVITE and the
+    # ringing overlap session and room I/O setup.
+    sip_identity = f"phone-{phone_number}"
+    dial_task = None
+    if phone_number and sip_trunk_id:
+        logger.info("Dialing %s via SIP trunk %s", phone_number, sip_trunk_id)
+        dial_task = asyncio.create_task(ctx.api.sip.create_sip_participant(
+            api.CreateSIPParticipantRequest(
+                sip_trunk_id=sip_trunk_id,
+                sip_call_to=phone_number,
+                room_name=ctx.room.name,
+                participant_identity=sip_identity,
+                participant_name=store_name,
+                wait_until_answered=True,
+            )
+        ))
+
     # Start the agent
-    await session.start(
-        room=ctx.room,
-        agent=agent,
-        room_options=RoomOptions(
-            # Audio-only — no text or video input
-            text_input=False,
-            video_input=False,
-        ),
-    )
+    try:
+        await session.start(
+            room=ctx.room,
+            agent=agent,
+            room_options=RoomOptions(
+                # Audio-only — no text or video input
+                text_input=False,
+                video_input=False,
+            ),
+        )
+    except BaseException:
+        if dial_task is not None:
+            await _abort_dial(ctx, dial_task)
+        if greeting_task is not None:
+            greeting_task.cancel()
+        raise
 
     @session.on("user_input_transcribed")
     def on_user_transcript(ev):
         if ev.is_final:
             if _is_likely_garbage(ev.transcript):
-                logger.warning(f"[STT GARBAGE] Likely noise artifact: '{ev.transcript}'")
-            logger.info(f"[USER] {ev.transcript}")
-            transcript_lines.append({"role": "user", "text": ev.transcript, "time": datetime.now().isoformat()})
+                logger.warning("[STT GARBAGE] Likely noise artifact: '%s'", ev.transcript)
+            logger.info("[USER] %s", ev.transcript)
+            transcript_lines.append({"role": "user", "text": ev.transcript, "t": time.monotonic()})
 
     @session.on("conversation_item_added")
     def on_conversation_item(ev):
@@ -800,29 +1374,32 @@ STORE: {store_name}{area_info}
             text = "".join(str(c) for c in item.content)
             was_interrupted = getattr(item, "interrupted", False)
             if was_interrupted:
-                logger.warning(f"[INTERRUPTED] Agent speech truncated: '{text}'")
-            logger.info(f"[LLM] {'[TRUNCATED] ' if was_interrupted else ''}{text}")
+                logger.warning("[INTERRUPTED] Agent speech truncated: '%s'", text)
+            logger.info("[LLM] %s%s", "[TRUNCATED] " if was_interrupted else "", text)
             transcript_lines.append({
-                "role": "assistant", "text": text, "time": datetime.now().isoformat(),
+                "role": "assistant", "text": text, "t": time.monotonic(),
                 **({"interrupted": True} if was_interrupted else {}),
             })
 
     @session.on("function_tools_executed")
     def on_tools_executed(ev):
         for fc in ev.function_calls:
-            logger.info(f"[TOOL CALL] {fc.name}({fc.arguments})")
+            logger.info("[TOOL CALL] %s(%s)", fc.name, fc.arguments)
         for out in ev.function_call_outputs:
             if out:
-                logger.info(f"[TOOL RESULT] {out.name} → {out.output}")
+                logger.info("[TOOL RESULT] %s → %s", out.name, out.output)
 
     @session.on("metrics_collected")
     def on_metrics(ev):
+        # Fires for every STT/TTS/VAD metrics event too — bail out cheaply
+        # when INFO is off, and only log LLM metrics (has prompt_tokens).
+        if not logger.isEnabledFor(logging.INFO):
+            return
         m = ev.metrics
-        # Only log LLM metrics (has prompt_tokens attribute)
         if hasattr(m, "prompt_tokens"):
             logger.info(
-                f"[LLM METRICS] tokens: {m.prompt_tokens}→{m.completion_tokens}, "
-                f"TTFT: {m.ttft:.2f}s, duration: {m.duration:.2f}s"
+                "[LLM METRICS] tokens: %d→%d, TTFT: %.2fs, duration: %.2fs",
+                m.prompt_tokens, m.completion_tokens, m.ttft, m.duration,
             )
 
     @session.on("agent_state_changed")
@@ -846,66 +1423,50 @@ STORE: {store_name}{area_info}
             # Detect TTS language errors (English text sent to Hindi TTS)
             if 'allowed languages' in error_str or 'at least one character' in error_str:
                 logger.error(
-                    f"[TTS CRASH] English text sent to Hindi TTS: "
-                    f"source={source_name}, error={error_str}"
+                    "[TTS CRASH] English text sent to Hindi TTS: source=%s, error=%s",
+                    source_name, error_str,
                 )
             elif error.recoverable:
                 logger.warning(
-                    f"[SESSION ERROR] (recoverable) source={source_name}, "
-                    f"label={error.label}, error={error.error}"
+                    "[SESSION ERROR] (recoverable) source=%s, label=%s, error=%s",
+                    source_name, error.label, error.error,
                 )
             else:
                 logger.error(
-                    f"[SESSION ERROR] (non-recoverable) source={source_name}, "
-                    f"label={error.label}, error={error.error}"
+                    "[SESSION ERROR] (non-recoverable) source=%s, label=%s, error=%s",
+                    source_name, error.label, error.error,
                 )
                 _save_transcript()
         else:
-            logger.error(f"[SESSION ERROR] source={source_name}, error={error}")
+            logger.error("[SESSION ERROR] source=%s, error=%s", source_name, error)
 
     # ---- Transcript & log cleanup (idempotent — safe to call multiple times) ----
-    _transcript_saved = False
+    _save_task = None    # background transcript write, started once
+    _finish_task = None  # save-then-close-log, started once
     _log_closed = False
+    _timeout_task = None  # SIP max-duration timer, cancelled when the call ends
 
-    def _save_transcript():
-        nonlocal _transcript_saved
-        if _transcript_saved or not transcript_lines:
-            return
-        _transcript_saved = True
-        transcript_dir = Path(__file__).parent / "transcripts"
-        transcript_dir.mkdir(exist_ok=True)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = transcript_dir / f"{store_name.replace(' ', '_')}_{ts}.json"
-        data = {
-            "store_name": store_name,
-            "product_description": product_description,
-            "room": ctx.room.name,
-            "phone": phone_number or "browser",
-            "timestamp": datetime.now().isoformat(),
-            "messages": transcript_lines,
-        }
-        try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logger.info(f"[TRANSCRIPT] Saved to {filename}")
-        except Exception as e:
-            logger.error(f"[TRANSCRIPT] Failed to save: {e}")
-            return
+    def _cancel_call_timeout():
+        if _timeout_task and not _timeout_task.done():
+            _timeout_task.cancel()
 
-        # Post-call quality analysis — writes companion .analysis.json
-        try:
-            from call_analysis import analyze_transcript
-            analysis = analyze_transcript(data)
-            analysis_file = filename.with_suffix(".analysis.json")
-            with open(analysis_file, "w", encoding="utf-8") as f:
-                json.dump(analysis, f, ensure_ascii=False, indent=2)
-            topics = ", ".join(analysis.get("topics_covered", []))
-            logger.info(
-                f"[ANALYSIS] Score: {analysis['overall_score']}, "
-                f"Topics: [{topics}], Turns: {analysis['turn_count']}"
-            )
-        except Exception as e:
-            logger.warning(f"[ANALYSIS] Post-call analysis failed (non-fatal): {e}")
+    def _save_transcript():
+        """Snapshot the transcript and write it to disk on a worker thread.
+
+        Returns the write task — the same one on repeat calls — or None if
+        nothing has been said yet."""
+        nonlocal _save_task
+        if _save_task is None and transcript_lines:
+            data = {
+                "store_name": store_name,
+                "product_description": product_description,
+                "room": ctx.room.name,
+                "phone": phone_number or "browser",
+                "timestamp": datetime.now().isoformat(),
+                "messages": _with_wall_times(transcript_lines, started_at, started_mono),
+            }
+            _save_task = asyncio.create_task(asyncio.to_thread(_write_transcript_files, data))
+        return _save_task
 
     def _close_log():
         nonlocal _log_closed
@@ -914,40 +1475,83 @@ STORE: {store_name}{area_info}
         _log_closed = True
         logging.getLogger().removeHandler(call_log_handler)
         call_log_handler.close()
-        logger.info(f"[LOG] Call log saved to {call_log_path}")
+        logger.info("[LOG] Call log saved to %s", call_log_path)
+
+    async def _finish():
+        _cancel_call_timeout()
+        save = _save_transcript()
+        if save is not None:
+            # Shielded so a cancelled caller can't abandon a half-written file;
+            # the log is closed after the save so its messages land in it.
+            await asyncio.shield(save)
+        _close_log()
+
+    def _finish_call():
+        """Save the transcript, then close the call log — once per call.
+
+        Returns the task doing so, or None when there was nothing to save
+        (e.g. the callee hung up before anyone spoke) and the cleanup ran
+        inline without scheduling a task."""
+        nonlocal _finish_task
+        if _finish_task is None:
+            if _save_task is None and not transcript_lines:
+                _cancel_call_timeout()
+                _close_log()
+                return None
+            _finish_task = asyncio.create_task(_finish())
+        return _finish_task
 
     # Wire save function onto agent so end_call can use it
     agent._save_transcript_fn = _save_transcript
 
-    @session.on("close")
+    # Either event ends the call and _finish_call is idempotent, so each
+    # handler only needs to run once — whichever fires second is a no-op.
+    @session.once("close")
     def on_close(ev):
-        logger.info(f"[SESSION CLOSE] reason={ev.reason}")
-        _save_transcript()
-        _close_log()
-
-    @ctx.room.on("participant_disconnected")
-    def on_participant_left(participant):
-        logger.info(f"Participant {participant.identity} left — saving transcript and closing call log")
-        _save_transcript()
-        _close_log()
+        logger.info("[SESSION CLOSE] reason=%s", ev.reason)
+        _finish_call()
 
-    # Now dial the store (or wait for browser participant)
+    # A browser leaving already closes the session (RoomOptions'
+    # close_on_disconnect), so only SIP calls need the room-level hook — it
+    # fires on the callee's hangup without waiting for the session to wind down.
     if phone_number and sip_trunk_id:
-        logger.info(f"Dialing {phone_number} via SIP trunk {sip_trunk_id}")
+        @ctx.room.once("participant_disconnected")
+        def on_participant_left(participant):
+            logger.info("Participant %s left — saving transcript and closing call log", participant.identity)
+            _finish_call()
+
+    # The job waits on shutdown callbacks, so a transcript write that is
+    # still in flight when the room goes away is finished before exit.
+    async def _on_shutdown():
+        finishing = _finish_call()
+        if finishing is not None:
+            await finishing
+
+    ctx.add_shutdown_callback(_on_shutdown)
+
+    async def _say_greeting():
+        """Play the pre-synthesized greeting, or fall back to live TTS."""
         try:
-            await ctx.api.sip.create_sip_participant(
-                api.CreateSIPParticipantRequest(
-                    sip_trunk_id=sip_trunk_id,
-                    sip_call_to=phone_number,
-                    room_name=ctx.room.name,
-                    participant_identity=f"phone-{phone_number}",
-                    participant_name=store_name,
-                )
+            greeting_frames = await greeting_task
+        except Exception as e:
+            logger.warning("[GREETING] Pre-synthesis failed, falling back to live TTS: %s", e)
+            session.say(greeting, allow_interruptions=True, add_to_chat_ctx=True)
+        else:
+            session.say(
+                greeting, audio=_replay_frames(greeting_frames),
+                allow_interruptions=True, add_to_chat_ctx=True,
             )
-            logger.info(f"SIP call initiated to {phone_number}")
+
+    # Now wait for the store to answer (or for the browser participant)
+    if dial_task is not None:
+        try:
+            await dial_task
+            logger.info("SIP call answered by %s — sending greeting", phone_number)
         except Exception as e:
-            logger.error(f"Failed to initiate SIP call: {e}")
+            greeting_task.cancel()
+            logger.error("Failed to initiate SIP call: %s", e)
             return
+        await _say_greeting()
     elif not phone_number:
         # Browser session — wait for browser participant, then greet.
         # Greeting is added to chat context so the LLM sees it as its first
@@ -955,32 +1559,31 @@ STORE: {store_name}{area_info}
         # user message before it to satisfy the user-first requirement.
         logger.info("Browser session — waiting for browser participant to join")
         try:
-            await asyncio.wait_for(ctx.wait_for_participant(), timeout=30.0)
-        except asyncio.TimeoutError:
+            async with asyncio.timeout(30.0):
+                await ctx.wait_for_participant()
+        except TimeoutError:
+            greeting_task.cancel()
             logger.error("Browser participant did not join within 30 seconds — shutting down")
             return
         logger.info("Browser participant joined — sending greeting")
         # add_to_chat_ctx=True fires conversation_item_added, which appends to transcript_lines
-        session.say(greeting, add_to_chat_ctx=True)
+        await _say_greeting()
 
     if not is_browser:
-        # Set a maximum call duration timer (SIP calls only)
+        # Set a maximum call duration timer (SIP calls only). The task is
+        # cancelled as soon as the call ends (session close, participant left,
+        # or job shutdown) so it never outlives a short call.
         async def call_timeout():
+            nonlocal _timeout_task
             await asyncio.sleep(300)  # 5 minutes max
+            _timeout_task = None  # deadline reached — the hangup below must not cancel itself
             logger.info("Call timeout reached, saving transcript and ending call")
-            _save_transcript()
-            for participant in ctx.room.remote_participants.values():
-                try:
-                    await ctx.api.room.remove_participant(
-                        api.RoomParticipantIdentity(
-                            room=ctx.room.name,
-                            identity=participant.identity,
-                        )
-                    )
-                except Exception:
-                    pass
+            save = _save_transcript()
+            if save is not None:
+                await asyncio.shield(save)
+            await _hang_up(ctx, sip_identity)
 
-        asyncio.create_task(call_timeout())
+        _timeout_task = asyncio.create_task(call_timeout())
 
 
 # ---------------------------------------------------------------------------
@@ -990,6 +1593,7 @@ if __name__ == "__main__":
     agents.cli.run_app(
         agents.WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
             agent_name="price-agent",  # Must match dispatch requests
         )
     )
@@ -184,7 +184,7 @@ class ConversationScorer:
         return topics
 
     # Reverse mapping: Hindi word -> number (e.g., "adtees" -> 38)
-    _HINDI_TO_NUM = {v: k for k, v in _HINDI_ONES.items() if v}
+    _HINDI_TO_NUM = {v: k for k, v in enumerate(_HINDI_ONES) if v}
 
     def check_price_echo(self, messages: list[dict]) -> float:
         for i, msg in enumerate(messages):
@@ -219,7 +219,7 @@ class ConversationScorer:
             price_str = str(price_num)
             hindi_form = _number_to_hindi(price_num) if price_num < 100000 else price_str
             # Also get just the thousands word for partial matching
-            thousands_word = _HINDI_ONES.get(price_num // 1000, '') if price_num >= 1000 else ''
+            thousands_word = _HINDI_ONES[price_num // 1000] if 1000 <= price_num < 100000 else ''
 
             for j in range(i + 1, min(i + 3, len(messages))):
                 if messages[j].get('role') == 'assistant':
@@ -302,7 +302,7 @@ class ConversationScorer:
                     hindi = _number_to_hindi(int_num)
                     forms.append(hindi.lower())
                     if int_num >= 1000:
-                        tw = _HINDI_ONES.get(int_num // 1000, '')
+                        tw = _HINDI_ONES[int_num // 1000]
                         if tw:
                             forms.append(tw)
 
@@ -18,6 +18,7 @@ sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
 from agent_worker import (
     _normalize_for_tts,
     _strip_think_tags,
+    _ThinkTagFilter,
     _ACTION_RE,
     _replace_numbers,
     _number_to_hindi,
@@ -29,6 +30,11 @@ from agent_worker import (
     SanitizedAgent,
     _create_llm,
     _setup_call_logger,
+    _attach_call_log_handler,
+    _build_instructions,
+    DispatchMetadata,
+    _write_json,
+    _with_wall_times,
     DEFAULT_INSTRUCTIONS,
     CLAUDE_MODEL,
 )
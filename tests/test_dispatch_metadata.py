@@ -0,0 +1,58 @@
+"""Tests for DispatchMetadata — parsing the agent dispatch JSON metadata."""
+
+import json
+import os
+from unittest.mock import patch
+
+from tests.conftest import DispatchMetadata
+
+
+class TestDispatchMetadata:
+    def test_empty_metadata_uses_defaults(self):
+        meta = DispatchMetadata.from_json("")
+        assert meta.phone == ""
+        assert meta.store_name == "Unknown Store"
+        assert meta.product_description == "appliance"
+        assert meta.voice_speaker == "shubh"
+        assert meta.voice_pace == 1.0
+        assert meta.instructions_override is None
+
+    def test_none_metadata_uses_defaults(self):
+        assert DispatchMetadata.from_json(None) == DispatchMetadata.from_json("{}")
+
+    def test_fields_parsed(self):
+        meta = DispatchMetadata.from_json(json.dumps({
+            "phone": "+919876543210",
+            "store_name": "Gupta Electronics",
+            "product_description": "Samsung 1.5 Ton AC",
+            "nearby_area": "Jayanagar",
+            "sip_trunk_id": "ST_abc",
+            "greeting": "Hello ji",
+        }))
+        assert meta.phone == "+919876543210"
+        assert meta.store_name == "Gupta Electronics"
+        assert meta.product_description == "Samsung 1.5 Ton AC"
+        assert meta.nearby_area == "Jayanagar"
+        assert meta.sip_trunk_id == "ST_abc"
+        assert meta.greeting == "Hello ji"
+
+    def test_legacy_ac_model_field(self):
+        meta = DispatchMetadata.from_json(json.dumps({"ac_model": "LG 1 Ton AC"}))
+        assert meta.product_description == "LG 1 Ton AC"
+
+    def test_sip_trunk_falls_back_to_env(self):
+        with patch.dict(os.environ, {"SIP_OUTBOUND_TRUNK_ID": "ST_env"}):
+            meta = DispatchMetadata.from_json("{}")
+        assert meta.sip_trunk_id == "ST_env"
+
+    def test_voice_pace_coerced_to_float(self):
+        meta = DispatchMetadata.from_json(json.dumps({"voice_pace": "1.2"}))
+        assert meta.voice_pace == 1.2
+
+    def test_hindi_metadata_round_trips(self):
+        meta = DispatchMetadata.from_json(json.dumps({"store_name": "गुप्ता स्टोर"}, ensure_ascii=False))
+        assert meta.store_name == "गुप्ता स्टोर"
+
+    def test_unknown_keys_ignored(self):
+        meta = DispatchMetadata.from_json(json.dumps({"store_name": "Gupta", "campaign": "x"}))
+        assert meta == DispatchMetadata(store_name="Gupta", sip_trunk_id=meta.sip_trunk_id)
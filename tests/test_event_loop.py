@@ -0,0 +1,34 @@
+"""Tests for _use_uvloop — event loop policy selection at import."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import agent_worker
+
+
+class TestUseUvloop:
+    def _fake_uvloop(self, monkeypatch):
+        fake = MagicMock()
+        monkeypatch.setattr(agent_worker, "uvloop", fake)
+        set_policy = MagicMock()
+        monkeypatch.setattr(asyncio, "set_event_loop_policy", set_policy)
+        return fake, set_policy
+
+    def test_plain_import_leaves_policy_alone(self, monkeypatch):
+        _, set_policy = self._fake_uvloop(monkeypatch)
+        assert agent_worker._use_uvloop("agent_worker") is False
+        set_policy.assert_not_called()
+
+    def test_worker_process_sets_policy(self, monkeypatch):
+        fake, set_policy = self._fake_uvloop(monkeypatch)
+        assert agent_worker._use_uvloop("__main__") is True
+        set_policy.assert_called_once_with(fake.EventLoopPolicy.return_value)
+
+    def test_job_process_sets_policy(self, monkeypatch):
+        _, set_policy = self._fake_uvloop(monkeypatch)
+        assert agent_worker._use_uvloop("__mp_main__") is True
+        set_policy.assert_called_once()
+
+    def test_missing_uvloop_is_a_no_op(self, monkeypatch):
+        monkeypatch.setattr(agent_worker, "uvloop", None)
+        assert agent_worker._use_uvloop("__main__") is False
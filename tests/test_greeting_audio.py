@@ -0,0 +1,47 @@
+"""Tests for greeting pre-synthesis — _synthesize_greeting."""
+
+from agent_worker import _synthesize_greeting
+
+
+class _FakeStream:
+    def __init__(self, frames):
+        self._frames = iter(frames)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            frame = next(self._frames)
+        except StopIteration:
+            raise StopAsyncIteration
+        return type("Ev", (), {"frame": frame})()
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _FakeTTS:
+    def __init__(self):
+        self.calls = []
+        self.streams = []
+
+    def synthesize(self, text):
+        self.calls.append(text)
+        stream = _FakeStream([f"{text}-frame-1", f"{text}-frame-2"])
+        self.streams.append(stream)
+        return stream
+
+
+class TestSynthesizeGreeting:
+    async def test_returns_all_frames(self):
+        tts = _FakeTTS()
+        frames = await _synthesize_greeting(tts, "Namaste")
+        assert frames == ["Namaste-frame-1", "Namaste-frame-2"]
+        assert tts.calls == ["Namaste"]
+
+    async def test_closes_the_stream(self):
+        tts = _FakeTTS()
+        await _synthesize_greeting(tts, "Namaste")
+        assert tts.streams[0].closed
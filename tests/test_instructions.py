@@ -0,0 +1,42 @@
+"""Tests for _build_instructions — default-mode system prompt assembly."""
+
+from tests.conftest import _build_instructions, DEFAULT_INSTRUCTIONS
+
+PRODUCT = "Samsung 1.5 Ton 5 Star Inverter Split AC"
+GREETING = f"Hello, yeh Gupta Electronics hai? {PRODUCT} ke baare mein poochna tha."
+
+
+class TestBuildInstructions:
+    def test_starts_with_stable_prefix(self):
+        result = _build_instructions(PRODUCT, "Gupta Electronics", "", GREETING)
+        assert result.startswith(DEFAULT_INSTRUCTIONS)
+
+    def test_prefix_identical_across_calls(self):
+        a = _build_instructions(PRODUCT, "Gupta Electronics", "", GREETING)
+        b = _build_instructions("LG Fridge", "Sharma Store", "Jayanagar", "Hello ji")
+        assert a[:len(DEFAULT_INSTRUCTIONS)] == b[:len(DEFAULT_INSTRUCTIONS)]
+
+    def test_product_and_store_in_suffix(self):
+        result = _build_instructions(PRODUCT, "Gupta Electronics", "", GREETING)
+        suffix = result[len(DEFAULT_INSTRUCTIONS):]
+        assert f"PRODUCT: {PRODUCT}" in suffix
+        assert "STORE: Gupta Electronics" in suffix
+
+    def test_area_included_when_given(self):
+        result = _build_instructions(PRODUCT, "Gupta Electronics", "Jayanagar", GREETING)
+        assert "YOUR AREA: Jayanagar" in result
+        assert "Jayanagar mein rehta hoon" in result
+
+    def test_area_omitted_when_empty(self):
+        result = _build_instructions(PRODUCT, "Gupta Electronics", "", GREETING)
+        assert "YOUR AREA:" not in result[len(DEFAULT_INSTRUCTIONS):]
+
+    def test_greeting_note_present(self):
+        result = _build_instructions(PRODUCT, "Gupta Electronics", "", GREETING)
+        assert f'You have already greeted the shopkeeper with: "{GREETING}"' in result
+        assert "Do NOT repeat the greeting" in result
+
+    def test_braces_in_metadata_are_literal(self):
+        result = _build_instructions("AC {1.5 ton}", "Store {x}", "", "Hi")
+        assert "PRODUCT: AC {1.5 ton}" in result
+        assert "STORE: Store {x}" in result
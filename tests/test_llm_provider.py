@@ -58,3 +58,13 @@ class TestCreateLlm:
                 mock_anthropic.return_value = MagicMock()
                 _create_llm()
                 assert mock_anthropic.call_args.kwargs["temperature"] == 0.7
+
+    def test_max_tokens_capped_for_both_providers(self):
+        with patch.dict(os.environ, {"LLM_PROVIDER": "qwen"}, clear=False):
+            with patch("agent_worker.openai.LLM") as mock_openai:
+                _create_llm()
+                assert mock_openai.call_args.kwargs["max_completion_tokens"] == 150
+        with patch.dict(os.environ, {"LLM_PROVIDER": "claude"}, clear=False):
+            with patch("agent_worker.anthropic.LLM") as mock_anthropic:
+                _create_llm()
+                assert mock_anthropic.call_args.kwargs["max_tokens"] == 150
@@ -1,15 +1,19 @@
 """Tests for per-call log saving — _setup_call_logger."""
 
+import asyncio
 import logging
 import os
 from pathlib import Path
 
-from tests.conftest import _setup_call_logger
+import pytest
+
+from agent_worker import LOGS_DIR
+from tests.conftest import _setup_call_logger, _attach_call_log_handler
 
 
 class TestSetupCallLogger:
-    def test_creates_log_file(self):
-        handler, log_path = _setup_call_logger("Test Store")
+    async def test_creates_log_file(self):
+        handler, log_path = await _setup_call_logger("Test Store")
         try:
             assert Path(log_path).exists()
             assert "Test_Store" in log_path
@@ -19,8 +23,8 @@ class TestSetupCallLogger:
             handler.close()
             os.unlink(log_path)
 
-    def test_handler_attached_to_root(self):
-        handler, log_path = _setup_call_logger("Test Store 2")
+    async def test_handler_attached_to_root(self):
+        handler, log_path = await _setup_call_logger("Test Store 2")
         try:
             assert handler in logging.getLogger().handlers
         finally:
@@ -28,8 +32,8 @@ class TestSetupCallLogger:
             handler.close()
             os.unlink(log_path)
 
-    def test_handler_level_is_debug(self):
-        handler, log_path = _setup_call_logger("Test Store 3")
+    async def test_handler_level_is_debug(self):
+        handler, log_path = await _setup_call_logger("Test Store 3")
         try:
             assert handler.level == logging.DEBUG
         finally:
@@ -37,8 +41,8 @@ class TestSetupCallLogger:
             handler.close()
             os.unlink(log_path)
 
-    def test_log_messages_written_to_file(self):
-        handler, log_path = _setup_call_logger("Test Store 4")
+    async def test_log_messages_written_to_file(self):
+        handler, log_path = await _setup_call_logger("Test Store 4")
         try:
             test_logger = logging.getLogger("test.log.write")
             test_logger.setLevel(logging.DEBUG)
@@ -51,8 +55,8 @@ class TestSetupCallLogger:
             handler.close()
             os.unlink(log_path)
 
-    def test_store_name_spaces_replaced(self):
-        handler, log_path = _setup_call_logger("Pai International Jayanagar")
+    async def test_store_name_spaces_replaced(self):
+        handler, log_path = await _setup_call_logger("Pai International Jayanagar")
         try:
             assert "Pai_International_Jayanagar" in log_path
         finally:
@@ -60,11 +64,78 @@ class TestSetupCallLogger:
             handler.close()
             os.unlink(log_path)
 
-    def test_cleanup_removes_handler(self):
-        handler, log_path = _setup_call_logger("Cleanup Test")
+    async def test_cleanup_removes_handler(self):
+        handler, log_path = await _setup_call_logger("Cleanup Test")
         root = logging.getLogger()
         assert handler in root.handlers
         root.removeHandler(handler)
         handler.close()
         assert handler not in root.handlers
         os.unlink(log_path)
+
+    async def test_close_drains_pending_records(self):
+        handler, log_path = await _setup_call_logger("Drain Test")
+        try:
+            test_logger = logging.getLogger("test.log.drain")
+            test_logger.setLevel(logging.DEBUG)
+            for i in range(200):
+                test_logger.info(f"queued line {i}")
+        finally:
+            logging.getLogger().removeHandler(handler)
+            handler.close()
+        content = Path(log_path).read_text()
+        assert "queued line 199" in content
+        os.unlink(log_path)
+
+    async def test_close_is_idempotent(self):
+        handler, log_path = await _setup_call_logger("Close Twice")
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+        handler.close()
+        os.unlink(log_path)
+
+    async def test_records_on_disk_once_queue_drains(self):
+        """The live dashboard tails the file, so an idle queue means flushed."""
+        handler, log_path = await _setup_call_logger("Drain Flush")
+        try:
+            test_logger = logging.getLogger("test.log.tail")
+            test_logger.setLevel(logging.DEBUG)
+            test_logger.info("[USER] kitne ka hai")
+            handler.queue.join()
+            assert "[USER] kitne ka hai" in Path(log_path).read_text()
+        finally:
+            logging.getLogger().removeHandler(handler)
+            handler.close()
+            os.unlink(log_path)
+
+    async def test_records_during_connect_reach_the_file(self):
+        """Records logged while the file is still being opened are kept."""
+        test_logger = logging.getLogger("test.log.early")
+        test_logger.setLevel(logging.DEBUG)
+
+        async def connect():
+            test_logger.info("logged during connect")
+
+        handler, log_path = await _setup_call_logger("Early Records", connect())
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+        assert "logged during connect" in Path(log_path).read_text()
+        os.unlink(log_path)
+
+    async def test_failed_connect_detaches_handler(self):
+        async def connect():
+            raise ConnectionError("room unreachable")
+
+        before = list(logging.getLogger().handlers)
+        with pytest.raises(ConnectionError):
+            await _setup_call_logger("Failed Connect", connect())
+        assert logging.getLogger().handlers == before
+        await asyncio.sleep(0.1)  # let the file open finish and be discarded
+        for path in LOGS_DIR.glob("Failed_Connect_*.log"):
+            os.unlink(path)
+
+    def test_close_before_start(self):
+        handler = _attach_call_log_handler()
+        handler.flush()
+        logging.getLogger().removeHandler(handler)
+        handler.close()
@@ -4,6 +4,7 @@ import pytest
 from tests.conftest import (
     _normalize_for_tts, _strip_think_tags, _replace_numbers,
     _number_to_hindi, _transliterate_devanagari, _NumberBufferedNormalizer,
+    _ThinkTagFilter,
 )
 
 
@@ -144,6 +145,19 @@ class TestSpacingFixes:
         result = normalize("hello   world   ji")
         assert "  " not in result
 
+    def test_newlines_flattened(self, normalize):
+        assert normalize("Achha.\n\nPrice kya hai?") == "Achha. Price kya hai?"
+
+    def test_tabs_and_crlf_flattened(self, normalize):
+        assert normalize("haan\tji\r\nbolo") == "haan ji bolo"
+
+    def test_plain_chunk_returned_unchanged(self, normalize):
+        chunk = " theek hai, Aap bolo"
+        assert normalize(chunk) is chunk
+
+    def test_chunk_boundary_spaces_kept(self, normalize):
+        assert normalize(" kitna ") == " kitna "
+
     def test_warranty_uppercase_boundary(self, normalize):
         result = normalize("warrantyKitni")
         assert "warranty Kitni" in result
@@ -218,6 +232,26 @@ class TestStripThinkTags:
         assert strip_think("<think>only thinking</think>") == ""
 
 
+class TestThinkTagFilter:
+    def test_plain_chunks_pass_through(self):
+        f = _ThinkTagFilter()
+        assert f.process("Achha ") == "Achha "
+        assert f.process("ji") == "ji"
+
+    def test_think_block_within_chunk(self):
+        f = _ThinkTagFilter()
+        assert f.process("<think>reasoning</think>Namaste") == "Namaste"
+
+    def test_think_block_across_chunks(self):
+        f = _ThinkTagFilter()
+        chunks = ["Haan <think>let me", " think about price", "</think> bhaisaab", " ji"]
+        assert "".join(f.process(c) for c in chunks) == "Haan  bhaisaab ji"
+
+    def test_multiple_blocks(self):
+        f = _ThinkTagFilter()
+        assert f.process("<think>a</think>Hello<think>b</think> ji") == "Hello ji"
+
+
 # ===================================================================
 # E. Full pipeline / combined tests
 # ===================================================================
@@ -296,6 +330,17 @@ class TestDevanagariTransliteration:
         result = _transliterate_devanagari("क्")
         assert result == "k"
 
+    def test_inherent_a_kept_without_matra(self):
+        assert _transliterate_devanagari("कम") == "kama"
+        assert _transliterate_devanagari("नमस्ते") == "namaste"
+
+    def test_unmapped_codepoints_dropped(self):
+        # ृ has no romanization but still strips the consonant's inherent 'a'
+        assert _transliterate_devanagari("कृपया") == "kpayaa"
+
+    def test_danda_becomes_period(self):
+        assert _transliterate_devanagari("Haan है।") == "Haan hai."
+
     def test_normalize_pipeline_strips_devanagari(self):
         """Ensure _normalize_for_tts catches Devanagari via transliteration."""
         result = _normalize_for_tts("Achha. Toh usका price kya hai?")
@@ -380,5 +425,58 @@ class TestNumberBufferedNormalizer:
         """Empty chunks should not cause errors."""
         buf = _NumberBufferedNormalizer()
         assert buf.process("") == ""
-        assert buf.process("hello") == "hello"
+        assert buf.process("hello") == ""  # held until a clause boundary
+        assert buf.process("") == ""
+        assert buf.flush() == "hello"
+        assert buf.flush() == ""
+
+    def test_releases_up_to_clause_boundary(self):
+        buf = _NumberBufferedNormalizer()
+        assert buf.process("Achha") == ""
+        assert buf.process(" ji,") == ""
+        assert buf.process(" price") == "Achha ji,"
+        assert buf.flush() == " price"
+
+    def test_comma_grouped_number_split_across_chunks(self):
+        buf = _NumberBufferedNormalizer()
+        combined = buf.process("Rate 28,") + buf.process("000 hai.") + buf.flush()
+        assert "attaaees hazaar" in combined
+
+    def test_long_run_released_at_word_boundary(self):
+        buf = _NumberBufferedNormalizer()
+        out = ""
+        for word in ("bhaisaab ", "woh ", "wala ", "model ", "jo ", "pichhle ", "hafte ", "aaya ", "tha "):
+            out += buf.process(word)
+        assert out  # released before any punctuation arrived
+        assert (out + buf.flush()).split() == "bhaisaab woh wala model jo pichhle hafte aaya tha".split()
+
+    def test_sentence_end_at_buffer_end_released(self):
+        """A short reply is spoken without waiting for a following chunk."""
+        buf = _NumberBufferedNormalizer()
+        assert buf.process("Haan ji.") == "Haan ji."
+        assert buf.process(" Kitne ka hai?") == " Kitne ka hai?"
         assert buf.flush() == ""
+
+    def test_trailing_dot_after_digit_held(self):
+        """'2.' may be the start of '2.5', so it is not released yet."""
+        buf = _NumberBufferedNormalizer()
+        assert buf.process("Rate 2.") == ""
+        assert buf.process("5 lakh hai.") + buf.flush() == "Rate dhaai lakh hai."
+
+    def test_held_text_released_at_word_boundary_after_deadline(self, monkeypatch):
+        import agent_worker
+        monkeypatch.setattr(agent_worker, "_COALESCE_SECONDS", 0.0)
+        buf = _NumberBufferedNormalizer()
+        assert buf.process("Achha ji ") == "Achha ji"
+        assert buf.process("28") == ""  # never released mid-number
+        assert buf.flush() == " attaaees"
+
+    def test_boundary_straddling_chunks_after_long_run(self):
+        """A clause end split across chunks is found after an unbroken run."""
+        buf = _NumberBufferedNormalizer()
+        for _ in range(30):
+            assert buf.process("12") == ""
+        assert buf.process(".") == ""
+        out = buf.process(" ji")
+        assert out.endswith(".")
+        assert buf.flush() == " ji"
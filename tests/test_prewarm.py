@@ -0,0 +1,75 @@
+"""Tests for prewarm — CPU pinning, Silero VAD load and warm-up inference."""
+
+from unittest.mock import MagicMock
+
+import numpy as np
+
+import agent_worker
+
+
+class TestWarmUpVad:
+    def test_runs_one_silent_window_on_the_loaded_session(self, monkeypatch):
+        model_cls = MagicMock()
+        model_cls.return_value.window_size_samples = 512
+        monkeypatch.setattr(agent_worker, "_SileroOnnxModel", model_cls)
+        vad = MagicMock()
+        vad._opts.sample_rate = 16000
+
+        agent_worker._warm_up_vad(vad)
+
+        model_cls.assert_called_once_with(onnx_session=vad._onnx_session, sample_rate=16000)
+        (frame,), _ = model_cls.return_value.call_args
+        assert frame.dtype == np.float32
+        assert frame.shape == (512,)
+        assert not frame.any()
+
+    def test_failure_does_not_break_prewarm(self, monkeypatch):
+        monkeypatch.setattr(agent_worker, "_SileroOnnxModel", MagicMock(side_effect=AttributeError("gone")))
+        agent_worker._warm_up_vad(MagicMock())  # logs and returns
+
+    def test_prewarm_stores_the_warmed_vad(self, monkeypatch):
+        warmed = []
+        monkeypatch.setattr(agent_worker, "_warm_up_vad", warmed.append)
+        proc = MagicMock()
+        proc.userdata = {}
+
+        agent_worker.prewarm(proc)
+
+        assert warmed == [proc.userdata["vad"]]
+
+
+class TestPinJobCore:
+    def _affinity(self, monkeypatch, allowed=(0, 1, 2, 3), pid=4242):
+        pinned = []
+        monkeypatch.setattr(agent_worker.os, "sched_getaffinity", lambda _: set(allowed), raising=False)
+        monkeypatch.setattr(agent_worker.os, "sched_setaffinity", lambda _, cores: pinned.append(cores), raising=False)
+        monkeypatch.setattr(agent_worker.os, "getpid", lambda: pid)
+        return pinned
+
+    def test_unset_leaves_affinity_alone(self, monkeypatch):
+        pinned = self._affinity(monkeypatch)
+        assert agent_worker._pin_job_core(None) is None
+        assert pinned == []
+
+    def test_processes_spread_over_listed_cores(self, monkeypatch):
+        chosen = set()
+        for pid in range(100, 104):
+            self._affinity(monkeypatch, pid=pid)
+            chosen.add(agent_worker._pin_job_core("0-1,3"))
+        assert chosen == {0, 1, 3}
+
+    def test_pins_one_core(self, monkeypatch):
+        pinned = self._affinity(monkeypatch, pid=7)
+        core = agent_worker._pin_job_core("2-3")
+        assert pinned == [{core}]
+        assert core in (2, 3)
+
+    def test_invalid_spec_skips_pinning(self, monkeypatch):
+        pinned = self._affinity(monkeypatch)
+        assert agent_worker._pin_job_core("two") is None
+        assert pinned == []
+
+    def test_unavailable_cores_skip_pinning(self, monkeypatch):
+        pinned = self._affinity(monkeypatch, allowed=(0, 1))
+        assert agent_worker._pin_job_core("8-9") is None
+        assert pinned == []
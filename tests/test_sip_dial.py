@@ -0,0 +1,34 @@
+"""Tests for _abort_dial — calling off the SIP dial when the session fails to start."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from agent_worker import _abort_dial
+
+
+def _ringing():
+    return asyncio.create_task(asyncio.sleep(3600))
+
+
+class TestAbortDial:
+    async def test_cancels_dial_and_deletes_room(self):
+        job_ctx = MagicMock()
+        job_ctx.delete_room = AsyncMock()
+        dial_task = _ringing()
+
+        await _abort_dial(job_ctx, dial_task)
+
+        await asyncio.sleep(0)
+        assert dial_task.cancelled()
+        job_ctx.delete_room.assert_awaited_once()
+
+    async def test_delete_failure_is_logged_not_raised(self, caplog):
+        job_ctx = MagicMock()
+        job_ctx.delete_room = AsyncMock(side_effect=RuntimeError("room gone"))
+        dial_task = _ringing()
+
+        await _abort_dial(job_ctx, dial_task)
+
+        await asyncio.sleep(0)
+        assert dial_task.cancelled()
+        assert "room gone" in caplog.text
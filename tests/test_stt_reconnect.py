@@ -0,0 +1,63 @@
+"""Tests for _patched_stt_run — bounded Sarvam STT reconnects."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from livekit.agents import APIConnectionError
+
+import agent_worker
+from agent_worker import _patched_stt_run, _STT_RECONNECT_ATTEMPTS
+
+
+def _stream(run_connection):
+    stream = MagicMock()
+    stream._run_connection = run_connection
+    stream._input_ch.closed = False
+    stream._session.closed = False
+    return stream
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleep = AsyncMock()
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return sleep
+
+
+class TestPatchedSttRun:
+    async def test_gives_up_as_non_retryable_after_attempts(self, sleeps):
+        stream = _stream(AsyncMock(side_effect=OSError("refused")))
+        with pytest.raises(APIConnectionError) as exc:
+            await _patched_stt_run(stream)
+        assert exc.value.retryable is False
+        assert isinstance(exc.value.__cause__, OSError)
+        assert stream._run_connection.await_count == _STT_RECONNECT_ATTEMPTS + 1
+        assert sleeps.await_count == _STT_RECONNECT_ATTEMPTS
+
+    async def test_deadline_stops_before_attempts_run_out(self, sleeps, monkeypatch):
+        monkeypatch.setattr(agent_worker, "_STT_RECONNECT_DEADLINE", 1.0)
+        stream = _stream(AsyncMock(side_effect=OSError("refused")))
+        with pytest.raises(APIConnectionError):
+            await _patched_stt_run(stream)
+        # 0.25 + 0.5 fit in the budget; the next 1s wait would not
+        assert stream._run_connection.await_count == 3
+
+    async def test_closed_input_reraises_original_error(self, sleeps):
+        stream = _stream(AsyncMock(side_effect=OSError("refused")))
+        stream._input_ch.closed = True
+        with pytest.raises(OSError):
+            await _patched_stt_run(stream)
+        sleeps.assert_not_awaited()
+
+    async def test_normal_end_reconnects_until_input_closes(self, sleeps):
+        stream = _stream(None)
+
+        async def run_connection():
+            if stream._run_connection.await_count == 2:
+                stream._input_ch.closed = True
+
+        stream._run_connection = AsyncMock(side_effect=run_connection)
+        await _patched_stt_run(stream)
+        assert stream._run_connection.await_count == 2
+        sleeps.assert_not_awaited()
@@ -5,6 +5,8 @@ import pytest
 from datetime import datetime
 from pathlib import Path
 
+from tests.conftest import _write_json, _with_wall_times
+
 TRANSCRIPTS_DIR = Path(__file__).parent.parent / "transcripts"
 
 
@@ -67,20 +69,18 @@ class TestExistingTranscripts:
 
 
 class TestTranscriptSaveLogic:
-    """Test the save logic by replicating what _save_transcript does."""
+    """Test the save logic used by _save_transcript."""
 
     def test_save_and_reload(self, tmp_path, sample_transcript_data):
         filename = tmp_path / "test_transcript.json"
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(sample_transcript_data, f, ensure_ascii=False, indent=2)
+        _write_json(filename, sample_transcript_data)
         loaded = json.loads(filename.read_text(encoding="utf-8"))
         assert loaded == sample_transcript_data
 
     def test_ensure_ascii_false_preserves_hindi(self, tmp_path):
         data = {"messages": [{"role": "assistant", "text": "ए सी का रेट", "time": "2026-01-01T00:00:00"}]}
         filename = tmp_path / "hindi_test.json"
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        _write_json(filename, data)
         raw = filename.read_text(encoding="utf-8")
         assert "ए सी" in raw  # Should NOT be escaped to \uXXXX
 
@@ -90,3 +90,27 @@ class TestTranscriptSaveLogic:
         filename = f"{store_name.replace(' ', '_')}_{ts}.json"
         assert " " not in filename
         assert filename.endswith(".json")
+
+    def test_monotonic_stamps_become_iso_times(self):
+        started_at = datetime(2026, 2, 11, 17, 27, 40)
+        lines = [
+            {"role": "user", "text": "Hello", "t": 100.0},
+            {"role": "assistant", "text": "Namaste", "t": 102.5, "interrupted": True},
+        ]
+        stamped = _with_wall_times(lines, started_at, started_mono=99.0)
+        assert stamped == [
+            {"role": "user", "text": "Hello", "time": "2026-02-11T17:27:41"},
+            {"role": "assistant", "text": "Namaste", "time": "2026-02-11T17:27:43.500000", "interrupted": True},
+        ]
+        assert list(stamped[1]) == ["role", "text", "time", "interrupted"]
+        assert "time" not in lines[0]  # live transcript left untouched
+
+    def test_write_transcript_files(self, tmp_path, monkeypatch, sample_transcript_data):
+        import agent_worker
+        monkeypatch.setattr(agent_worker, "TRANSCRIPTS_DIR", tmp_path / "transcripts")
+        agent_worker._write_transcript_files(sample_transcript_data)
+        saved = [f for f in (tmp_path / "transcripts").glob("*.json")
+                 if not f.name.endswith(".analysis.json")]
+        assert len(saved) == 1
+        assert saved[0].name.startswith(sample_transcript_data["store_name"].replace(" ", "_"))
+        assert json.loads(saved[0].read_text(encoding="utf-8")) == sample_transcript_data